@@ -1,6 +1,7 @@
 import sys
 import os
 import logging
+import time
 import streamlit as st
 
 # Add the project root directory to the Python path
@@ -14,33 +15,51 @@ logging.basicConfig(
     stream=sys.stdout
 )
 
-from utils import document_loader, vectorstore, prompts, search
-from models.llm import gemini_generate, groq_generate
+from core import pipeline
+from utils import telemetry
+
+
+def _progress_reporter():
+    """
+    Returns a `progress(done, total)` callback that renders embedding progress,
+    plus the placeholder to clear once ingestion finishes.
+    """
+    placeholder = st.empty()
+
+    def report(done, total):
+        if total:
+            placeholder.progress(done / total, text=f"Embedded {done}/{total} chunks")
+        else:
+            placeholder.caption(f"Embedded {done} chunks...")
+
+    return report, placeholder
 
 
 def process_document(uploaded_file, url, pasted_text):
     """
     Extracts text from a source and builds a vector store.
+    Uploaded files are streamed page by page; the returned text is a preview of the
+    document's beginning rather than the full text.
     """
     try:
         logging.info("Starting document processing.")
-        if uploaded_file:
-            text = (
-                document_loader.extract_text_from_pdf(uploaded_file)
-                if uploaded_file.type == "application/pdf"
-                else document_loader.extract_text_from_docx(uploaded_file)
-            )
-        elif url:
-            text = document_loader.extract_text_from_url(url)
-        elif pasted_text and pasted_text.strip():
-            text = pasted_text
-        else:
+        if not (uploaded_file or url or (pasted_text and pasted_text.strip())):
             st.error("Please provide a document, URL, or paste text to process.")
             return None
 
-        chunks = document_loader.split_text(text)
-        vectorstore.create_vectorstore(chunks)
+        progress, placeholder = _progress_reporter()
+        source = "upload" if uploaded_file else "url" if url else "text"
+        with telemetry.span("process_document", profile=True, source=source):
+            if uploaded_file:
+                doc_id, text = pipeline.ingest_upload(uploaded_file, progress=progress)
+            elif url:
+                doc_id, text = pipeline.ingest_url(url, progress=progress)
+            else:
+                doc_id, text = pipeline.ingest_text(pasted_text, progress=progress)
+        placeholder.empty()
+
         st.session_state["doc_text"] = text
+        st.session_state["doc_id"] = doc_id
         logging.info("Document processing successful.")
         return text
     except Exception as e:
@@ -51,78 +70,60 @@ def process_document(uploaded_file, url, pasted_text):
 
 def perform_initial_analysis(text, model_choice, detail_level):
     """
-    Generates a summary and extracts the company name from the text.
+    Generates a whole-document summary, extracts the company name and lists risky
+    clauses. `text` is the beginning of the document; the summary covers every chunk
+    of the processed document.
     """
     try:
-        logging.info(f"Performing initial analysis with {model_choice}.")
-        llm_generate = groq_generate if model_choice == "Groq" else gemini_generate
-
-        summary_prompt = prompts.SUMMARY_PROMPT.format(
-            context=text[:2500],
-            question="Summarize this document for a user.",
-            detail_level=detail_level.lower()
-        )
-        summary = llm_generate(summary_prompt).strip()
-        logging.info("Summary generated.")
-        
-        company_name = "the document"
-        lines = text.split('\n')
-        if lines:
-            for line in lines[:10]:
-                if len(line.strip()) > 5:
-                    company_name = line.strip()
-                    break
-        logging.info(f"Extracted company/document name: {company_name}")
-
-        return {"summary": summary, "company_name": company_name}
+        return pipeline.analyze_document(st.session_state.get("doc_id"), text, model_choice, detail_level)
     except Exception as e:
         logging.error(f"Error in perform_initial_analysis: {e}", exc_info=True)
         return {
             "summary": "Could not generate a summary for the document.",
-            "company_name": "the document"
+            "company_name": "the document",
+            "risks": ""
         }
 
 
-def get_response(query, detail_level, app_mode, model_choice):
+NO_DOCUMENT_MESSAGE = "I need a document to analyze. Please use the 'Attach' button to upload one."
+ERROR_MESSAGE = "Sorry, a critical error occurred. Please check the application logs."
+
+
+def stream_response(query, detail_level, app_mode, model_choice):
     """
-    Gets a response based on the selected application mode.
+    Gets a response based on the selected application mode, yielding it piece by
+    piece as the model produces it.
     """
-    logging.info(f"--- Starting response generation for mode: {app_mode} ---")
-    llm_generate = groq_generate if model_choice == "Groq" else gemini_generate
-    
+    logging.info(f"--- Starting streamed response for mode: {app_mode} ---")
+    start = time.perf_counter()
     try:
-        if app_mode == "Analyzer":
-            vs = vectorstore.load_vectorstore()
-            if not vs:
-                st.warning("No document is loaded. Please process a document first for analysis.")
-                return "I need a document to analyze. Please use the 'Attach' button to upload one."
-
-            context_docs = vs.similarity_search(query, k=3)
-            context = "\n".join([d.page_content for d in context_docs])
-            prompt = prompts.QA_PROMPT.format(context=context, question=query, detail_level=detail_level.lower())
-
-        elif app_mode == "T&C Writer":
-            prompt = prompts.REWRITE_PROMPT.format(clause=query)
-
-        else:  # General Chat
-            logging.info("No document context found. Performing live web search.")
-            context = search.live_web_search(query)
-            prompt = prompts.GENERAL_CHAT.format(context=context, question=query, detail_level=detail_level.lower())
-
-        logging.info(f"Generating answer with {model_choice}...")
-        answer = llm_generate(prompt)
-        logging.info("--- Response generation finished successfully. ---")
-        return answer.strip()
+        # Only the part before the first token runs inside a span; the whole answer
+        # is recorded once the stream is done
+        with telemetry.span("prepare_answer", profile=True, mode=app_mode, provider=model_choice):
+            prepared = pipeline.prepare_answer(
+                st.session_state.get("doc_id"), query, detail_level, app_mode, model_choice
+            )
+        if not prepared.has_document:
+            st.warning("No document is loaded. Please process a document first for analysis.")
+            yield NO_DOCUMENT_MESSAGE
+            return
+
+        yield from pipeline.stream_answer(prepared)
+        telemetry.record_span(
+            "answer", time.perf_counter() - start, mode=app_mode, provider=model_choice,
+            cache="hit" if prepared.cached is not None else "miss",
+        )
+        logging.info("--- Streamed response finished successfully. ---")
 
     except Exception as e:
-        logging.error(f"CRITICAL ERROR in get_response: {e}", exc_info=True)
+        logging.error(f"CRITICAL ERROR in stream_response: {e}", exc_info=True)
         st.error(f"An error occurred: {e}")
-        return "Sorry, a critical error occurred. Please check the application logs."
+        yield ERROR_MESSAGE
 
 
 def clear_document_memory():
     """Clears document-related data from the session state."""
-    keys_to_clear = ["document_processed", "doc_text", "doc_summary", "company_name"]
+    keys_to_clear = ["document_processed", "doc_text", "doc_id", "doc_summary", "company_name", "risks"]
     for key in keys_to_clear:
         if key in st.session_state:
             del st.session_state[key]
@@ -166,15 +167,17 @@ def main_app_page(app_mode, detail_level, model_choice):
                     with st.spinner("Processing document..."):
                         text = process_document(uploaded_file, url, pasted_text)
                         if text:
-                            analysis = perform_initial_analysis(text, model_choice, detail_level)
-                            st.session_state.update(analysis)
+                            result = perform_initial_analysis(text, model_choice, detail_level)
+                            st.session_state.update(result)
                             st.session_state.document_processed = True
                             st.session_state.show_attachment = False
 
                             summary_message = (
-                                f"**Document Processed: {analysis.get('company_name')}**\n\n"
-                                f"**Summary:**\n{analysis.get('summary')}"
+                                f"**Document Processed: {result.get('company_name')}**\n\n"
+                                f"**Summary:**\n{result.get('summary')}"
                             )
+                            if result.get("risks"):
+                                summary_message += f"\n\n**Clauses to watch:**\n{result['risks']}"
                             st.session_state.messages.append({"role": "assistant", "content": summary_message})
                             st.rerun()
 
@@ -189,12 +192,11 @@ def main_app_page(app_mode, detail_level, model_choice):
         with st.chat_message("user"):
             st.markdown(query)
 
-        with st.spinner("Generating response..."):
-            response = get_response(query, detail_level, app_mode, model_choice)
-            with st.chat_message("assistant"):
-                st.markdown(response)
-        
-        st.session_state.messages.append({"role": "assistant", "content": response})
+        # Tokens are rendered as they arrive; write_stream returns the full text
+        with st.chat_message("assistant"):
+            response = st.write_stream(stream_response(query, detail_level, app_mode, model_choice))
+
+        st.session_state.messages.append({"role": "assistant", "content": response.strip()})
         st.rerun()
 
 def about_page():
@@ -235,6 +237,9 @@ def main():
         initial_sidebar_state="expanded"
     )
 
+    # Exposes /metrics when TELEMETRY_METRICS_PORT is set; a no-op on reruns
+    telemetry.start_metrics_server()
+
     # Initialize session state variables
     st.session_state.setdefault("messages", [])
     st.session_state.setdefault("model_choice", "Groq")
@@ -276,6 +281,9 @@ def main():
     else:
         # Pass settings from the sidebar to the main page function
         main_app_page(app_mode, detail_level, model_choice)
+        if app_mode == "Analyzer":
+            # Load the embedding model in the background once the page is on screen
+            pipeline.prewarm_embeddings()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+Headless bulk contract review: ingest a folder of PDF / DOCX / TXT files and URLs,
+answer a fixed set of questions about each document and stream the results to JSONL.
+
+    python batch.py contracts/ --questions questions.txt --output results.jsonl
+
+Sources already recorded as done in the output file are skipped, so an interrupted
+run resumes where it stopped when started again with the same output file.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, PROJECT_ROOT)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    stream=sys.stdout
+)
+
+from core import pipeline
+from utils import telemetry
+from config.config import BATCH_WORKERS
+
+FILE_TYPES = (".pdf", ".docx", ".txt")
+URL_LIST_TYPE = ".url"
+
+DEFAULT_QUESTIONS = [
+    "Who are the parties to this agreement?",
+    "What is the term of the agreement and how can it be terminated?",
+    "Does the agreement renew automatically?",
+    "What are the payment terms?",
+    "How is liability limited or capped?",
+    "What indemnification obligations apply?",
+    "Which law governs the agreement and how are disputes resolved?",
+]
+
+
+def read_lines(path):
+    """
+    Non-empty lines of a text file, ignoring '#' comments.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def collect_sources(inputs, url_file=None):
+    """
+    Expand files and directories into a sorted list of documents to review. `.url`
+    files (and `url_file`) list one URL per line.
+    """
+    sources = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+        else:
+            files = [path]
+        for file in sorted(files):
+            extension = os.path.splitext(file)[1].lower()
+            if extension in FILE_TYPES:
+                sources.append(file)
+            elif extension == URL_LIST_TYPE:
+                sources.extend(read_lines(file))
+    if url_file:
+        sources.extend(read_lines(url_file))
+    # Keep the first occurrence of each source
+    return list(dict.fromkeys(sources))
+
+
+def completed_sources(output_path):
+    """
+    Sources with a successful record in an existing output file.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run
+                continue
+            if record.get("status") == "ok":
+                done.add(record["source"])
+    return done
+
+
+class ResultWriter:
+    """
+    Appends one JSON record per line and syncs it to disk, so every finished
+    document survives an interruption.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def review_one(source, questions, args):
+    started = time.perf_counter()
+    try:
+        record = pipeline.review(source, questions, args.model, args.detail, analyze=args.analyze)
+        record["status"] = "ok"
+    except Exception as e:
+        logging.error(f"Failed to review {source}: {e}", exc_info=True)
+        record = {"source": source, "status": "error", "error": str(e)}
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run(args):
+    questions = read_lines(args.questions) if args.questions else DEFAULT_QUESTIONS
+    sources = collect_sources(args.inputs, args.urls)
+    done = completed_sources(args.output)
+    pending = [s for s in sources if s not in done]
+    logging.info(
+        f"{len(sources)} documents found, {len(sources) - len(pending)} already done, "
+        f"{len(pending)} to review with {len(questions)} questions each."
+    )
+    if not pending:
+        return 0
+
+    telemetry.start_metrics_server()
+    writer = ResultWriter(args.output)
+    started = time.perf_counter()
+    finished = failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(review_one, source, questions, args) for source in pending]
+            for future in as_completed(futures):
+                record = future.result()
+                writer.write(record)
+                finished += 1
+                failed += record["status"] != "ok"
+                rate = finished / max(time.perf_counter() - started, 1e-9) * 60
+                logging.info(
+                    f"[{finished}/{len(pending)}] {record['source']}: {record['status']} "
+                    f"in {record['seconds']:.1f}s ({rate:.1f} documents/minute)"
+                )
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    logging.info(
+        f"Reviewed {finished} documents in {elapsed:.1f}s "
+        f"({finished / max(elapsed, 1e-9) * 60:.1f} documents/minute); {failed} failed."
+    )
+    return 1 if failed else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Review a batch of contracts without the Streamlit UI.")
+    parser.add_argument("inputs", nargs="+", help="Files or directories (.pdf, .docx, .txt, .url lists).")
+    parser.add_argument("--urls", help="Text file with one URL per line.")
+    parser.add_argument("--questions", help="Text file with one question per line (default: built-in set).")
+    parser.add_argument("--output", default="results.jsonl", help="JSONL file results are appended to.")
+    parser.add_argument("--model", choices=["Groq", "Gemini"], default="Groq")
+    parser.add_argument("--detail", choices=["Concise", "Detailed"], default="Concise")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Documents reviewed in parallel.")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Also record the summary, company name and risky clauses.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,96 @@
+"""
+Check ClauseMate's cold-start import cost against a budget.
+
+Imports a module in a fresh interpreter with `python -X importtime`, reports the
+slowest top-level imports, and fails (exit status 1) when the import takes longer than
+the budget or pulls in a heavy dependency that should only load on first use.
+
+Run from the project root:
+    python -m benchmarks.bench_import_time                    # import app
+    python -m benchmarks.bench_import_time --module batch --budget-ms 1500
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+# Loaded only by the modes and stages that need them
+HEAVY_MODULES = [
+    "torch", "sentence_transformers", "transformers", "faiss", "langchain_community",
+    "google.generativeai", "langchain_groq", "tavily", "fitz", "docx", "bs4",
+]
+
+# Cold import of app/batch must stay under this
+DEFAULT_BUDGET_MS = 2500.0
+
+_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module):
+    """
+    Import `module` in a new interpreter. Returns a list of (name, self_us,
+    cumulative_us, depth) for every module it loaded.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return entries
+
+
+def total_ms(entries):
+    return sum(self_us for _, self_us, _, _ in entries) / 1000
+
+
+def heavy_imports(entries):
+    """
+    The HEAVY_MODULES (or their submodules) among the imported entries.
+    """
+    loaded = {name for name, _, _, _ in entries}
+    return sorted(
+        module for module in HEAVY_MODULES
+        if any(name == module or name.startswith(module + ".") for name in loaded)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs to take the fastest of.")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(max(1, args.repeat))]
+    entries = min(runs, key=total_ms)
+    elapsed_ms = total_ms(entries)
+
+    print(f"import {args.module}: {elapsed_ms:.0f}ms ({len(entries)} modules, budget {args.budget_ms:.0f}ms)")
+    top_level = sorted((e for e in entries if e[3] <= 1), key=lambda e: -e[2])
+    for name, _, cumulative_us, _ in top_level[:args.top]:
+        print(f"  {cumulative_us / 1000:>9.1f}ms  {name}")
+
+    heavy = heavy_imports(entries)
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if elapsed_ms > args.budget_ms:
+        print(f"FAIL: import took {elapsed_ms:.0f}ms, over the {args.budget_ms:.0f}ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Compare FAISS index types on synthetic clustered embeddings: recall@k against an
+exact flat index, query throughput, build time and serialized size.
+
+Run from the project root:
+    python -m benchmarks.bench_index_types --vectors 200000 --queries 1000 --k 10
+"""
+import argparse
+import time
+
+import faiss
+import numpy as np
+from utils.ann import build_index, configure_search
+
+
+def make_vectors(n, d, clusters, seed):
+    """
+    Unit-length vectors around random cluster centres, roughly like sentence embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, d)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, d)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f[f >= 0]) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def run(name, index, queries, truth, k, build_seconds):
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    elapsed = time.perf_counter() - start
+    size_mb = len(faiss.serialize_index(index)) / 1e6
+    print(
+        f"{name:<22} recall@{k}={recall_at_k(found, truth):.3f}  "
+        f"qps={len(queries) / elapsed:>9.0f}  build={build_seconds:>6.2f}s  size={size_mb:>8.1f}MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, default=48)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.vectors, args.dim, clusters=256, seed=0)
+    queries = make_vectors(args.queries, args.dim, clusters=256, seed=1)
+
+    start = time.perf_counter()
+    flat = build_index(vectors, "flat")
+    flat_build = time.perf_counter() - start
+    _, truth = flat.search(queries, args.k)
+    run("flat", flat, queries, truth, args.k, flat_build)
+
+    variants = [
+        ("ivf", {}, [4, 16, 64]),
+        ("ivf-pq", {"pq_m": args.pq_m}, [16, 64]),
+        ("hnsw", {}, [32, 64, 128]),
+    ]
+    for name, kwargs, settings in variants:
+        start = time.perf_counter()
+        index = build_index(vectors, "hnsw" if name == "hnsw" else "ivf", **kwargs)
+        build_seconds = time.perf_counter() - start
+        for setting in settings:
+            if name == "hnsw":
+                configure_search(index, ef_search=setting)
+                label = f"{name} efSearch={setting}"
+            else:
+                configure_search(index, nprobe=setting)
+                label = f"{name} nprobe={setting}"
+            run(label, index, queries, truth, args.k, build_seconds)
+
+
+if __name__ == "__main__":
+    main()
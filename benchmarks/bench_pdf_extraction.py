@@ -0,0 +1,66 @@
+"""
+Compare serial and process-pool PDF text extraction on a synthetic document.
+
+Run from the project root:
+    python -m benchmarks.bench_pdf_extraction --pages 400 --workers 4
+"""
+import argparse
+import io
+import time
+
+import fitz  # PyMuPDF
+from utils.document_loader import iter_pdf_pages
+
+CLAUSE = (
+    "{n}. The Customer shall indemnify and hold harmless the Provider from any claims, "
+    "damages or liabilities arising out of the Customer's use of the Services, except "
+    "to the extent caused by the Provider's gross negligence or wilful misconduct."
+)
+
+
+def make_pdf(pages, clauses_per_page=25):
+    """
+    Build an in-memory PDF with `pages` pages of contract-like text.
+    """
+    doc = fitz.open()
+    n = 1
+    for _ in range(pages):
+        page = doc.new_page()
+        text = "\n".join(CLAUSE.format(n=n + i) for i in range(clauses_per_page))
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=7)
+        n += clauses_per_page
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def time_extraction(data, parallel, workers, repeat):
+    best = float("inf")
+    pages = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pages = list(iter_pdf_pages(io.BytesIO(data), parallel=parallel, workers=workers))
+        best = min(best, time.perf_counter() - start)
+    return best, pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    data = make_pdf(args.pages)
+    serial_time, serial_pages = time_extraction(data, False, 1, args.repeat)
+    parallel_time, parallel_pages = time_extraction(data, True, args.workers, args.repeat)
+
+    assert serial_pages == parallel_pages, "parallel extraction returned different text or order"
+    print(f"pages:    {args.pages}")
+    print(f"serial:   {serial_time:.3f}s ({args.pages / serial_time:.0f} pages/s)")
+    print(f"parallel: {parallel_time:.3f}s ({args.pages / parallel_time:.0f} pages/s, {args.workers} workers)")
+    print(f"speedup:  {serial_time / parallel_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
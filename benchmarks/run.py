@@ -0,0 +1,364 @@
+"""
+Benchmark ClauseMate's hot paths on synthetic (and optional fixture) legal documents
+of increasing size, with Groq, Gemini and Tavily served by the local stub server.
+
+Stages timed per document size: PDF / DOCX extraction, splitting, embedding, index
+build (cold embedding cache) and load, hybrid search, and end-to-end answers. Each
+stage reports p50/p95 latency, throughput and the process's peak RSS so far.
+
+Run from the project root:
+    python -m benchmarks.run --pages 10 50 200 --output bench.json
+    python -m benchmarks.run --baseline bench.json            # compare against a saved run
+    python -m benchmarks.run --fake-embeddings --repeat 3     # no model download needed
+
+Everything is written to a temporary working directory, so the real vector store and
+caches are left alone.
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+sys.path.insert(0, PROJECT_ROOT)
+
+CLAUSES = [
+    "The Customer shall pay all invoices within {n} days of the invoice date. Late payments "
+    "accrue interest at {r}% per month or the maximum rate permitted by law, whichever is lower.",
+    "Either party may terminate this Agreement on {n} days' written notice if the other party "
+    "materially breaches it and fails to cure the breach within that period.",
+    "This Agreement renews automatically for successive {n}-month terms unless either party gives "
+    "notice of non-renewal at least {r} days before the end of the current term.",
+    "Except for indemnification obligations, neither party's aggregate liability shall exceed the "
+    "fees paid in the {n} months preceding the claim.",
+    "The Provider shall indemnify the Customer against third-party claims that the Services "
+    "infringe any patent, copyright or trade secret, provided notice is given within {n} days.",
+    "This Agreement is governed by the laws of the State of Delaware. Disputes shall be resolved "
+    "by binding arbitration in Wilmington within {n} days of a notice of dispute.",
+    "Each party shall keep the other's Confidential Information secret for {n} years after "
+    "termination and use it only to perform its obligations under this Agreement.",
+    "The Provider may update these Terms on {n} days' notice; continued use of the Services after "
+    "that period constitutes acceptance of the updated Terms.",
+]
+
+QUESTIONS = [
+    "When are invoices due and what interest applies to late payments?",
+    "How can either party terminate the agreement?",
+    "Does the agreement renew automatically?",
+    "Is liability capped?",
+    "Which law governs disputes?",
+    "How long does confidentiality last?",
+]
+
+
+def clause_text(count, seed):
+    rng = random.Random(seed)
+    return [
+        f"{i + 1}. " + rng.choice(CLAUSES).format(n=rng.randint(5, 90), r=rng.randint(1, 30))
+        for i in range(count)
+    ]
+
+
+def make_pdf(pages, clauses_per_page=12, seed=0):
+    import fitz  # PyMuPDF
+
+    doc = fitz.open()
+    clauses = clause_text(pages * clauses_per_page, seed)
+    for p in range(pages):
+        page = doc.new_page()
+        text = "\n".join(clauses[p * clauses_per_page:(p + 1) * clauses_per_page])
+        page.insert_textbox(page.rect + (36, 36, -36, -36), text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def make_docx(pages, clauses_per_page=12, seed=0):
+    from docx import Document
+
+    doc = Document()
+    for p, clause in enumerate(clause_text(pages * clauses_per_page, seed)):
+        doc.add_paragraph(clause)
+        if p % clauses_per_page == clauses_per_page - 1:
+            doc.add_page_break()
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words hashing embeddings with the real model's dimension.
+    Stands in for the sentence-transformer when only the pipeline around it is measured.
+    """
+
+    def __init__(self, dim=384):
+        self.dim = dim
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in text.lower().split():
+            digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+            vector[int.from_bytes(digest[:4], "little") % self.dim] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def summarize(samples, units=1):
+    """
+    p50/p95/mean latency in milliseconds and throughput in `units` per second.
+    """
+    seconds = np.asarray(samples, dtype=np.float64)
+    return {
+        "samples": len(samples),
+        "p50_ms": float(np.percentile(seconds, 50) * 1000),
+        "p95_ms": float(np.percentile(seconds, 95) * 1000),
+        "mean_ms": float(seconds.mean() * 1000),
+        "throughput_per_s": float(units / np.median(seconds)) if np.median(seconds) else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def timed(call, repeat):
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = call()
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.results = {}
+
+    def record(self, stage, label, samples, units=1):
+        name = f"{stage}@{label}"
+        self.results[name] = summarize(samples, units)
+        r = self.results[name]
+        throughput = f"{r['throughput_per_s']:>10.1f}/s" if r["throughput_per_s"] else " " * 12
+        print(f"{name:<34} p50={r['p50_ms']:>9.2f}ms  p95={r['p95_ms']:>9.2f}ms  "
+              f"{throughput}  rss={r['peak_rss_mb']:>7.1f}MB")
+
+    def document(self, label, text, pdf=None, docx=None, pages=1):
+        from utils import document_loader, vectorstore
+        from models.embeddings import get_embeddings_model
+
+        repeat = self.args.repeat
+        if pdf is not None:
+            samples, text = timed(lambda: document_loader.extract_text_from_pdf(io.BytesIO(pdf)), repeat)
+            self.record("extract_pdf", label, samples, pages)
+        if docx is not None:
+            samples, _ = timed(lambda: document_loader.extract_text_from_docx(io.BytesIO(docx)), repeat)
+            self.record("extract_docx", label, samples, pages)
+
+        samples, chunks = timed(lambda: document_loader.split_text(text), repeat)
+        self.record("split_text", label, samples, len(chunks))
+
+        embeddings = get_embeddings_model()
+        samples, _ = timed(lambda: embeddings.embed_documents(chunks), repeat)
+        self.record("embed", label, samples, len(chunks))
+
+        # Tag the chunks per run so every build misses the persistent embedding cache
+        samples, doc_id = [], None
+        for run in range(repeat):
+            tagged = [f"{chunk} [run {run}]" for chunk in chunks]
+            doc_id = vectorstore.document_id("\n".join(tagged))
+            start = time.perf_counter()
+            vectorstore.create_vectorstore(tagged, doc_id)
+            samples.append(time.perf_counter() - start)
+        self.record("index_build", label, samples, len(chunks))
+
+        samples = []
+        for _ in range(repeat):
+            vectorstore.invalidate_vectorstore()
+            start = time.perf_counter()
+            vectorstore.load_vectorstore(doc_id)
+            samples.append(time.perf_counter() - start)
+        self.record("index_load", label, samples)
+
+        queries = QUESTIONS * self.args.queries_per_question
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            vectorstore.search(doc_id, query)
+            samples.append(time.perf_counter() - start)
+        self.record("search", label, samples)
+
+        for provider in ("Groq", "Gemini"):
+            self.answers(label, doc_id, provider, "Analyzer", f"answer_{provider.lower()}")
+        return doc_id
+
+    def answers(self, label, doc_id, provider, app_mode, stage):
+        from core import pipeline
+        from utils import answer_cache, search
+
+        samples = []
+        for query in QUESTIONS:
+            # Measure the full path, not the answer / search caches
+            answer_cache.clear_answer_cache()
+            search.set_search_backend(None)
+            start = time.perf_counter()
+            answer = pipeline.answer(doc_id, query, "Concise", app_mode, provider)
+            samples.append(time.perf_counter() - start)
+            if not answer:
+                raise RuntimeError(f"{stage} returned no answer for {query!r}")
+        self.record(stage, label, samples)
+
+    def run(self):
+        for pages in self.args.pages:
+            seed = pages
+            pdf = make_pdf(pages, seed=seed)
+            docx = make_docx(pages, seed=seed)
+            self.document(f"{pages}p", None, pdf=pdf, docx=docx, pages=pages)
+
+        for path in self.args.fixtures:
+            self.fixture(path)
+
+        self.answers("web", None, "Groq", "General Chat", "answer_web")
+        return self.results
+
+    def fixture(self, path):
+        from utils import document_loader
+
+        label = os.path.basename(path)
+        with open(path, "rb") as f:
+            data = f.read()
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".pdf":
+            self.document(label, None, pdf=data)
+        elif extension == ".docx":
+            text = document_loader.extract_text_from_docx(io.BytesIO(data))
+            self.document(label, text, docx=data)
+        else:
+            self.document(label, data.decode("utf-8", errors="replace"))
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of each stage against a baseline run. Returns the names of
+    stages whose p50 or p95 latency grew by more than `threshold` (a fraction).
+    """
+    regressions = []
+    print(f"\n{'stage':<34} {'p50':>16} {'p95':>16}")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms"):
+            change = (current[metric] - previous[metric]) / previous[metric] if previous[metric] else 0.0
+            changes.append(change)
+        flag = "  REGRESSION" if max(changes) > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<34} {changes[0]:>+15.1%} {changes[1]:>+15.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 50, 200],
+                        help="Sizes of the synthetic documents, in pages.")
+    parser.add_argument("--fixtures", nargs="*", default=[],
+                        help="Real .pdf/.docx/.txt documents to benchmark as well.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--queries-per-question", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub API latency in seconds.")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="Use hashing embeddings instead of loading the sentence-transformer.")
+    parser.add_argument("--output", help="Write results as JSON to this file.")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Latency growth (fraction) reported as a regression.")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    # Resolve paths before switching to the temporary working directory
+    args.fixtures = [os.path.abspath(path) for path in args.fixtures]
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    from benchmarks.stub_server import start_stub_server
+
+    server = start_stub_server(latency=args.latency)
+    stub_url = f"http://127.0.0.1:{server.server_address[1]}"
+    # Configuration is read at import time, so the environment must be in place before
+    # any ClauseMate module is imported; the temporary directory isolates the caches
+    for name in ("GROQ_BASE_URL", "GEMINI_API_ENDPOINT", "TAVILY_BASE_URL"):
+        os.environ[name] = stub_url
+    for name in ("GROQ_API_KEY", "GEMINI_API_KEY", "TAVILY_API_KEY"):
+        os.environ.setdefault(name, "benchmark")
+    workdir = tempfile.mkdtemp(prefix="clausemate-bench-")
+    os.chdir(workdir)
+
+    if args.fake_embeddings:
+        from models.embeddings import register_embeddings_model
+        register_embeddings_model(HashEmbeddings())
+
+    try:
+        results = Benchmark(args).run()
+    finally:
+        server.shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "fake_embeddings": args.fake_embeddings,
+            "stub_latency_s": args.latency,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {output}")
+
+    if baseline_path:
+        with open(baseline_path, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Local stub HTTP server that mimics the Groq, Gemini and Tavily REST APIs.
+
+Start it, then point ClauseMate at it through the environment:
+    python -m benchmarks.stub_server --port 8765 --latency 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8765 GEMINI_API_ENDPOINT=http://127.0.0.1:8765 \\
+        TAVILY_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+
+Each request sleeps for --latency seconds and answers with a canned reply, so client
+reuse, timeouts and retries can be exercised without network access or API keys.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "This is a stubbed answer. The document says you can cancel at any time."
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+    latency = 0.0
+    reply = REPLY
+    fail_every = 0  # answer every Nth request with a 503 to exercise retries
+    request_count = 0
+    _count_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with StubHandler._count_lock:
+            StubHandler.request_count += 1
+            count = StubHandler.request_count
+
+        time.sleep(self.latency)
+        if self.fail_every and count % self.fail_every == 0:
+            self._send_json(503, {"error": {"message": "stub overloaded", "code": 503}})
+            return
+
+        if self.path.startswith("/openai/v1/chat/completions"):
+            if request.get("stream"):
+                self._send_events((self._groq_chunk(request, piece) for piece in self._pieces()), done=True)
+            else:
+                self._send_json(200, self._groq_response(request))
+        elif ":streamGenerateContent" in self.path:
+            self._send_events(self._gemini_response(piece) for piece in self._pieces())
+        elif ":generateContent" in self.path:
+            self._send_json(200, self._gemini_response(self.reply))
+        elif self.path.startswith("/search"):
+            self._send_json(200, self._tavily_response(request))
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+
+    def _pieces(self):
+        words = self.reply.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+    def _send_events(self, payloads, done=False):
+        """
+        Answer with server-sent events, one per payload, pausing between them so
+        time-to-first-token differs measurably from total time.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for payload in payloads:
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.latency / 10)
+        if done:
+            # OpenAI-style terminator used by Groq; Gemini just closes the stream
+            self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def _groq_chunk(self, request, piece):
+        return {
+            "id": "stub-stream",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}],
+        }
+
+    def _groq_response(self, request):
+        return {
+            "id": f"stub-{time.time_ns()}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.reply},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _tavily_response(self, request):
+        query = request.get("query", "")
+        return {
+            "query": query,
+            "results": [
+                {
+                    "title": f"Result {i + 1} for {query}",
+                    "url": f"https://example.com/{abs(hash(query)) % 1000}/{i}",
+                    "content": f"Stubbed search result {i + 1} about {query}.",
+                    "score": 1.0 - i / 10,
+                }
+                for i in range(request.get("max_results", 3))
+            ],
+        }
+
+    def _gemini_response(self, text):
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": text}]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+        }
+
+
+def start_stub_server(port=0, latency=0.0, reply=REPLY, fail_every=0):
+    """
+    Start the stub server on a background thread. Returns the server; its port is
+    `server.server_address[1]`. Call `server.shutdown()` to stop it.
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "latency": latency, "reply": reply, "fail_every": fail_every,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Groq/Gemini/Tavily HTTP server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-every", type=int, default=0)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, fail_every=args.fail_every)
+    print(f"Stub API server listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
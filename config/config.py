@@ -1,22 +1,166 @@
 from dotenv import load_dotenv
 import os
-import streamlit as st
+import sys
 
 # Load environment variables from .env (used locally)
 load_dotenv()
 
-# API keys (fetched from environment or Streamlit secrets)
-GROQ_API_KEY = os.getenv("GROQ_API_KEY") or st.secrets.get("GROQ_API_KEY")
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY") or st.secrets.get("GEMINI_API_KEY")
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY") or st.secrets.get("TAVILY_API_KEY")
+
+def _secret(name):
+    """
+    Read a setting from the environment, falling back to Streamlit secrets. Streamlit
+    is only consulted when it is already loaded (i.e. inside the app), and outside it
+    (e.g. batch.py) there may be no secrets file, which is not an error.
+    """
+    value = os.getenv(name)
+    if value:
+        return value
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return None
+    try:
+        return st.secrets.get(name)
+    except Exception:
+        return None
+
+
+# API keys (fetched from environment or Streamlit secrets). They are resolved on first
+# access rather than at import, so importing the config never touches st.secrets.
+_SECRET_NAMES = ("GROQ_API_KEY", "GEMINI_API_KEY", "TAVILY_API_KEY")
+
+
+def __getattr__(name):
+    if name in _SECRET_NAMES:
+        value = _secret(name)
+        if value:
+            globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Default model names
 DEFAULT_GROQ_MODEL = "llama3-70b-8192"
 DEFAULT_GEMINI_MODEL = "gemini-1.5-flash"
 
+# Model behind each provider choice in the UI, and context window sizes in tokens
+MODEL_NAMES = {"Groq": DEFAULT_GROQ_MODEL, "Gemini": DEFAULT_GEMINI_MODEL}
+MODEL_CONTEXT_WINDOWS = {"llama3-70b-8192": 8192, "gemini-1.5-flash": 1048576}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Context packing: tokens kept free for the prompt template and the answer, and the
+# context budget for Analyzer answers (filled from the best QA_CANDIDATE_CHUNKS chunks)
+CONTEXT_RESERVED_TOKENS = 1536
+QA_CONTEXT_TOKENS = 2000
+QA_CANDIDATE_CHUNKS = 10
+
+# LLM provider clients. The base URL / endpoint overrides point the clients at another
+# server, e.g. benchmarks/stub_server.py for local testing.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BACKOFF = 1.0
+LLM_MAX_CONNECTIONS = 20
+
+# General Chat web search: reused Tavily client, TTL cache keyed by normalized query,
+# and reformulated queries searched concurrently. TAVILY_BASE_URL points the client
+# at another server, e.g. benchmarks/stub_server.py.
+TAVILY_BASE_URL = os.getenv("TAVILY_BASE_URL")
+SEARCH_CACHE_TTL = 6 * 60 * 60
+SEARCH_CACHE_MAX_ENTRIES = 1024
+SEARCH_QUERY_VARIANTS = 3
+SEARCH_RESULTS_PER_QUERY = 3
+SEARCH_MAX_RESULTS = 5
+SEARCH_WORKERS = 8
+
+# Sentence-transformers model used for document and query embeddings
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
 # Document chunking parameters
 CHUNK_SIZE = 500
 CHUNK_OVERLAP = 50
 
-# FAISS index storage path
-VECTOR_DB_PATH = "vectorstore/faiss_index"
+# PDF extraction: PDFs with at least this many pages are extracted in a process pool
+PDF_PARALLEL_MIN_PAGES = 64
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = 16
+
+# URL ingestion: timeouts in seconds, download size limit and on-disk HTTP cache
+URL_CONNECT_TIMEOUT = 5
+URL_READ_TIMEOUT = 20
+URL_MAX_BYTES = 10 * 1024 * 1024
+URL_CACHE_DIR = ".cache/http"
+URL_POOL_SIZE = 10
+
+# Leading characters of a streamed document kept in memory for the summary preview
+STREAM_PREVIEW_CHARS = 20000
+
+# FAISS index storage: one content-addressed directory per document under this root
+VECTOR_DB_ROOT = "vectorstore"
+VECTOR_DB_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+# Initial analysis: map-reduce summary plus name and risky-clause passes run concurrently.
+# Concurrency and requests-per-minute limits are per provider.
+ANALYSIS_CONCURRENCY = {"Groq": 4, "Gemini": 8}
+ANALYSIS_REQUESTS_PER_MINUTE = {"Groq": 30, "Gemini": 60}
+ANALYSIS_SECTION_TOKENS = 1500
+ANALYSIS_MAX_SECTION_TOKENS = 5000
+ANALYSIS_MAX_SECTIONS = 32
+
+# Semantic answer cache: a question hits when its cosine similarity to a cached one
+# about the same document (and mode, detail level, model) is at least the threshold
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL = 24 * 60 * 60
+ANSWER_CACHE_MAX_ENTRIES = 4096
+
+# FAISS index type: "flat" (exact), "ivf", "hnsw", or "auto" to switch from flat to
+# FAISS_ANN_TYPE once an index holds FAISS_ANN_MIN_CHUNKS vectors. Indexes are per
+# document and exact search over tens of thousands of chunks takes a few ms, so
+# approximate search only pays off far beyond any single contract's size
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "auto")
+FAISS_ANN_MIN_CHUNKS = int(os.getenv("FAISS_ANN_MIN_CHUNKS", "200000"))
+FAISS_ANN_TYPE = "ivf"
+FAISS_IVF_NLIST = 0  # 0 picks ~4*sqrt(n) lists
+FAISS_IVF_NPROBE = 16  # lists scanned per query: higher = better recall, slower
+FAISS_PQ_M = 0  # >0 enables product quantization with this many sub-quantizers (must divide 384)
+FAISS_HNSW_M = 32
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = 64  # HNSW search breadth: higher = better recall, slower
+
+# Analyzer retrieval: BM25 + dense candidates fused with reciprocal rank fusion
+RETRIEVAL_K = 3
+RETRIEVAL_CANDIDATES = 20
+HYBRID_DENSE_WEIGHT = 0.5
+RRF_K = 60
+RETRIEVAL_MMR = False
+RETRIEVAL_MMR_LAMBDA = 0.7
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# Persistent chunk embedding cache, keyed by (model, chunk text hash)
+EMBEDDING_CACHE_PATH = "vectorstore/embedding_cache.sqlite3"
+# Least-recently-used vectors beyond this are dropped (~1.5 KB each for 384-d vectors)
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "250000"))
+
+# Ingestion: chunks per encode call and number of parallel embedding workers
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# In-memory cache of loaded FAISS indexes (per document)
+INDEX_CACHE_MAX_ENTRIES = 16
+INDEX_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Headless batch review (batch.py): documents processed in parallel
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+
+# Tracing and metrics (utils/telemetry.py). Finished spans are appended to
+# TELEMETRY_JSON_LOG as JSON lines when it is set, and Prometheus-style metrics are
+# served on TELEMETRY_METRICS_PORT when it is non-zero. With TELEMETRY_PROFILE_SLOW_SECONDS
+# > 0, request-level spans are stack-sampled every TELEMETRY_PROFILE_INTERVAL seconds and
+# the hottest stacks of requests slower than the threshold are logged.
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") != "0"
+TELEMETRY_JSON_LOG = os.getenv("TELEMETRY_JSON_LOG")
+TELEMETRY_METRICS_PORT = int(os.getenv("TELEMETRY_METRICS_PORT", "0"))
+TELEMETRY_PROFILE_SLOW_SECONDS = float(os.getenv("TELEMETRY_PROFILE_SLOW_SECONDS", "0"))
+TELEMETRY_PROFILE_INTERVAL = 0.005
+TELEMETRY_PROFILE_TOP_STACKS = 10
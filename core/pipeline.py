@@ -0,0 +1,299 @@
+"""
+UI-free ClauseMate pipeline: ingestion, initial analysis and question answering.
+Used by the Streamlit app and the batch CLI; raises exceptions instead of rendering them.
+"""
+import importlib
+import io
+import logging
+import os
+import threading
+import time
+
+from utils import prompts, search, telemetry
+from utils.context import pack_context, token_budget, log_prompt_tokens
+from utils.lazy import lazy_import
+from models.llm import gemini_generate, groq_generate, gemini_stream, groq_stream
+from config.config import MODEL_NAMES, QA_CONTEXT_TOKENS, QA_CANDIDATE_CHUNKS
+
+# Only the Analyzer needs the document, vector store and embedding stack (fitz, docx,
+# FAISS, torch); General Chat and the T&C Writer never import them
+document_loader = lazy_import("utils.document_loader")
+vectorstore = lazy_import("utils.vectorstore")
+answer_cache = lazy_import("utils.answer_cache")
+analysis = lazy_import("utils.analysis")
+
+PDF_TYPE = "application/pdf"
+
+_PREWARM_LOCK = threading.Lock()
+_PREWARM_STARTED = False
+
+
+def llm_generate_for(model_choice):
+    return groq_generate if model_choice == "Groq" else gemini_generate
+
+
+def llm_stream_for(model_choice):
+    return groq_stream if model_choice == "Groq" else gemini_stream
+
+
+def _prewarm():
+    start = time.perf_counter()
+    try:
+        importlib.import_module("utils.vectorstore")
+        importlib.import_module("models.embeddings").get_embeddings_model()
+        logging.info(f"Pre-warmed the Analyzer stack in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        logging.warning(f"Pre-warming the embedding model failed: {e}")
+
+
+def prewarm_embeddings():
+    """
+    Import the vector store stack and load the embedding model on a background thread,
+    so the first document doesn't wait for them. Only the first call starts the thread.
+    """
+    global _PREWARM_STARTED
+    with _PREWARM_LOCK:
+        if _PREWARM_STARTED:
+            return
+        _PREWARM_STARTED = True
+    threading.Thread(target=_prewarm, name="prewarm-embeddings", daemon=True).start()
+
+
+# --- Ingestion ---------------------------------------------------------------
+
+def ingest_text(text, progress=None):
+    """
+    Index already-extracted text. Returns (doc_id, text).
+    """
+    if not text or not text.strip():
+        raise ValueError("The document contains no text.")
+    with telemetry.span("ingest_text", bytes=len(text.encode("utf-8"))) as span:
+        doc_id = vectorstore.document_id(text)
+        exists = vectorstore.vectorstore_exists(doc_id)
+        span.set(cache="hit" if exists else "miss")
+        if not exists:
+            chunks = document_loader.split_text(text)
+            vectorstore.create_vectorstore(chunks, doc_id, progress=progress)
+        return doc_id, text
+
+
+def ingest_url(url, progress=None):
+    """
+    Fetch and index a web page. Returns (doc_id, text).
+    """
+    with telemetry.span("fetch_url"):
+        text = document_loader.extract_text_from_url(url)
+    return ingest_text(text, progress)
+
+
+def ingest_file(data, is_pdf, progress=None):
+    """
+    Stream a PDF or DOCX file's bytes into the index page by page. A file that was
+    indexed before is recognised by its raw bytes and nothing is extracted.
+    Returns (doc_id, preview) where preview is the beginning of the document.
+    """
+    with telemetry.span("ingest_file", bytes=len(data)) as span:
+        key = vectorstore.upload_key(data)
+        known = vectorstore.lookup_upload(key)
+        span.set(cache="miss" if known is None else "hit")
+        if known is not None:
+            return known
+
+        pages = (
+            document_loader.iter_pdf_pages(io.BytesIO(data))
+            if is_pdf
+            else document_loader.iter_docx_pages(io.BytesIO(data))
+        )
+        doc_id, preview = vectorstore.index_pages(pages, progress=progress)
+        vectorstore.remember_upload(key, doc_id, preview)
+        return doc_id, preview
+
+
+def ingest_upload(uploaded_file, progress=None):
+    """
+    Index an uploaded PDF or DOCX. Returns (doc_id, preview).
+    """
+    return ingest_file(uploaded_file.getvalue(), uploaded_file.type == PDF_TYPE, progress)
+
+
+def ingest_path(path, progress=None):
+    """
+    Index a .pdf, .docx or .txt file from disk. Returns (doc_id, preview).
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".pdf", ".docx"):
+        with open(path, "rb") as f:
+            data = f.read()
+        return ingest_file(data, extension == ".pdf", progress)
+    if extension == ".txt":
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return ingest_text(f.read(), progress)
+    raise ValueError(f"Unsupported file type: {path}")
+
+
+def ingest_source(source, progress=None):
+    """
+    Index a file path or an http(s) URL. Returns (doc_id, preview).
+    """
+    if source.startswith(("http://", "https://")):
+        return ingest_url(source, progress)
+    return ingest_path(source, progress)
+
+
+# --- Analysis ----------------------------------------------------------------
+
+def analyze_document(doc_id, preview, model_choice, detail_level):
+    """
+    Whole-document summary, company name and risky clauses for an indexed document.
+    """
+    logging.info(f"Performing initial analysis with {model_choice}.")
+    with telemetry.span("initial_analysis", provider=model_choice) as span:
+        chunks = vectorstore.get_chunks(doc_id) or document_loader.split_text(preview)
+        span.set(chunks=len(chunks))
+        result = analysis.run_initial_analysis(
+            chunks, preview, llm_generate_for(model_choice), model_choice, detail_level
+        )
+    logging.info(f"Extracted company/document name: {result['company_name']}")
+    return result
+
+
+# --- Question answering --------------------------------------------------------
+
+def answer_scope(doc_id, detail_level, app_mode, model_choice):
+    """
+    Cache scope for Analyzer answers: the same question about the same document
+    with the same settings gets the same answer. None when answers aren't cached.
+    """
+    if app_mode != "Analyzer" or not doc_id:
+        return None
+    return (doc_id, app_mode, detail_level, model_choice)
+
+
+def build_prompt(doc_id, query, detail_level, app_mode, model_choice, query_vector=None):
+    """
+    Builds the LLM prompt for the selected application mode.
+    Returns None when the Analyzer has no document to work with.
+    """
+    if app_mode == "Analyzer":
+        context_docs = vectorstore.search(doc_id, query, k=QA_CANDIDATE_CHUNKS, query_vector=query_vector)
+        if context_docs is None:
+            return None
+
+        model = MODEL_NAMES[model_choice]
+        context, stats = pack_context(
+            [d.page_content for d in context_docs], model, token_budget(model, QA_CONTEXT_TOKENS)
+        )
+        logging.info(
+            f"Packed {stats['chunks_used']} chunks ({stats['context_tokens']} tokens) into the context; "
+            f"{stats['chunks_dropped']} dropped."
+        )
+        return prompts.QA_PROMPT.format(context=context, question=query, detail_level=detail_level.lower())
+
+    if app_mode == "T&C Writer":
+        return prompts.REWRITE_PROMPT.format(clause=query)
+
+    # General Chat
+    logging.info("No document context found. Performing live web search.")
+    context = search.live_web_search(query)
+    return prompts.GENERAL_CHAT.format(context=context, question=query, detail_level=detail_level.lower())
+
+
+class PreparedAnswer:
+    """
+    Everything needed to answer a question: either a cached answer, or the prompt
+    (and cache scope) to send to the model. Both are None when the Analyzer has no document.
+    """
+
+    def __init__(self, query, model_choice, scope=None, query_vector=None, cached=None, prompt=None):
+        self.query = query
+        self.model_choice = model_choice
+        self.scope = scope
+        self.query_vector = query_vector
+        self.cached = cached
+        self.prompt = prompt
+
+    @property
+    def has_document(self):
+        return self.cached is not None or self.prompt is not None
+
+    def remember(self, answer):
+        if self.scope:
+            answer_cache.store(self.scope, self.query, self.query_vector, answer)
+
+
+def prepare_answer(doc_id, query, detail_level, app_mode, model_choice):
+    scope = answer_scope(doc_id, detail_level, app_mode, model_choice)
+    query_vector = None
+    if scope:
+        with telemetry.span("answer_cache") as span:
+            with telemetry.span("embed_query"):
+                query_vector = answer_cache.embed_query(query)
+            cached = answer_cache.lookup(scope, query_vector)
+            span.set(cache="miss" if cached is None else "hit")
+        if cached is not None:
+            return PreparedAnswer(query, model_choice, scope, query_vector, cached=cached)
+
+    with telemetry.span("build_prompt", mode=app_mode) as span:
+        prompt = build_prompt(doc_id, query, detail_level, app_mode, model_choice, query_vector)
+        if prompt is not None:
+            span.set(prompt_tokens=log_prompt_tokens(prompt, MODEL_NAMES[model_choice]))
+    return PreparedAnswer(query, model_choice, scope, query_vector, prompt=prompt)
+
+
+def generate_answer(prepared):
+    """
+    Full answer for a prepared question (the cached one if there is one).
+    """
+    if prepared.cached is not None:
+        return prepared.cached
+    logging.info(f"Generating answer with {prepared.model_choice}...")
+    answer = llm_generate_for(prepared.model_choice)(prepared.prompt).strip()
+    prepared.remember(answer)
+    return answer
+
+
+def stream_answer(prepared):
+    """
+    Yield the answer for a prepared question piece by piece.
+    """
+    if prepared.cached is not None:
+        yield prepared.cached
+        return
+    logging.info(f"Streaming answer with {prepared.model_choice}...")
+    pieces = []
+    for piece in llm_stream_for(prepared.model_choice)(prepared.prompt):
+        pieces.append(piece)
+        yield piece
+    prepared.remember("".join(pieces).strip())
+
+
+def answer(doc_id, query, detail_level="Concise", app_mode="Analyzer", model_choice="Groq"):
+    """
+    Answer one question. Returns None when the Analyzer has no indexed document.
+    """
+    with telemetry.span("answer", mode=app_mode, provider=model_choice):
+        prepared = prepare_answer(doc_id, query, detail_level, app_mode, model_choice)
+        if not prepared.has_document:
+            return None
+        return generate_answer(prepared)
+
+
+# --- Batch review --------------------------------------------------------------
+
+def review(source, questions, model_choice="Groq", detail_level="Concise", analyze=False):
+    """
+    Ingest one file path or URL and answer every question about it. With `analyze`,
+    the initial summary / company name / risky clauses are included as well.
+    Returns a JSON-serialisable record.
+    """
+    with telemetry.span("review", profile=True, questions=len(questions)):
+        with telemetry.span("process_document"):
+            doc_id, preview = ingest_source(source)
+        record = {"source": source, "doc_id": doc_id, "model": model_choice, "detail_level": detail_level}
+        if analyze:
+            record["analysis"] = analyze_document(doc_id, preview, model_choice, detail_level)
+        record["answers"] = [
+            {"question": q, "answer": answer(doc_id, q, detail_level, "Analyzer", model_choice)}
+            for q in questions
+        ]
+        return record
@@ -1,14 +1,111 @@
+import logging
+import os
+import threading
+import time
+
 import torch
 from langchain_community.embeddings import HuggingFaceEmbeddings
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS
+
+# Process-wide registry of loaded embedding models, keyed by (model_name, device)
+_MODELS = {}
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0, "loads": 0, "load_seconds": 0.0}
+
+
+def _default_device():
+    return "cuda" if torch.cuda.is_available() else "cpu"
 
-def get_embeddings_model():
+
+def _load_model(model_name, device):
     """
-    Load the HuggingFace embeddings model with automatic device selection.
+    Load and warm up a HuggingFace embeddings model.
     """
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    print(f"[INFO] Using device: {device}")
-
-    return HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2",
-        model_kwargs={"device": device}
+    start = time.perf_counter()
+    if device == "cpu" and EMBEDDING_WORKERS > 1:
+        # Split the cores between embedding workers instead of oversubscribing them
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // EMBEDDING_WORKERS))
+    model = HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": device},
+        encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE}
     )
+    # Run one tiny encode so the first real request doesn't pay for lazy initialisation
+    model.embed_query("warmup")
+    elapsed = time.perf_counter() - start
+
+    _STATS["loads"] += 1
+    _STATS["load_seconds"] += elapsed
+    logging.info(f"Loaded embeddings model {model_name} on {device} in {elapsed:.2f}s")
+    return model
+
+
+def get_embeddings_model(model_name=EMBEDDING_MODEL_NAME, device=None):
+    """
+    Return the shared embeddings model, loading it on first use.
+    """
+    device = device or _default_device()
+    key = (model_name, device)
+
+    model = _MODELS.get(key)
+    if model is not None:
+        _STATS["hits"] += 1
+        return model
+
+    with _LOCK:
+        # Another thread may have finished loading while we waited for the lock
+        model = _MODELS.get(key)
+        if model is not None:
+            _STATS["hits"] += 1
+            return model
+        _STATS["misses"] += 1
+        model = _load_model(model_name, device)
+        _MODELS[key] = model
+        return model
+
+
+def register_embeddings_model(model, model_name=EMBEDDING_MODEL_NAME, device=None):
+    """
+    Install an already-built embeddings object (e.g. a lightweight fake for
+    benchmarks) in place of loading `model_name`.
+    """
+    device = device or _default_device()
+    with _LOCK:
+        _MODELS[(model_name, device)] = model
+
+
+def evict_embeddings_model(model_name=None, device=None):
+    """
+    Drop loaded models from the registry. With no arguments every model is evicted.
+    Returns the number of models removed.
+    """
+    with _LOCK:
+        keys = [
+            key for key in _MODELS
+            if (model_name is None or key[0] == model_name)
+            and (device is None or key[1] == device)
+        ]
+        for key in keys:
+            del _MODELS[key]
+    if keys:
+        logging.info(f"Evicted {len(keys)} embeddings model(s) from the registry.")
+    return len(keys)
+
+
+def reload_embeddings_model(model_name=EMBEDDING_MODEL_NAME, device=None):
+    """
+    Force a fresh load of a model, replacing any registered instance.
+    """
+    device = device or _default_device()
+    evict_embeddings_model(model_name, device)
+    return get_embeddings_model(model_name, device)
+
+
+def get_embeddings_stats():
+    """
+    Return registry counters: cache hits/misses, model loads and total load time.
+    """
+    with _LOCK:
+        stats = dict(_STATS)
+        stats["loaded_models"] = [f"{name}@{device}" for name, device in _MODELS]
+    return stats
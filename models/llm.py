@@ -1,29 +1,293 @@
-import google.generativeai as genai
-from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage
-from config.config import GEMINI_API_KEY, GROQ_API_KEY, DEFAULT_GEMINI_MODEL, DEFAULT_GROQ_MODEL
+import logging
+import random
+import threading
+import time
 
-# Configure Gemini once using API key
-genai.configure(api_key=GEMINI_API_KEY)
+import httpx
+from config import config
+from config.config import (
+    DEFAULT_GEMINI_MODEL, DEFAULT_GROQ_MODEL,
+    GROQ_BASE_URL, GEMINI_API_ENDPOINT, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT,
+    LLM_MAX_RETRIES, LLM_RETRY_BACKOFF, LLM_MAX_CONNECTIONS,
+)
+from utils import telemetry
+from utils.context import count_tokens
 
-def gemini_generate(prompt, model=DEFAULT_GEMINI_MODEL, temperature=0.2):
-    model_instance = genai.GenerativeModel(model)
-    response = model_instance.generate_content(
-        prompt,
+# Provider SDKs (google.generativeai, langchain_groq) are imported on first use, so
+# starting the app doesn't pay for a provider that is never called
+_GENAI = None
+
+# Provider clients reused across calls, keyed by (provider, model, temperature)
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+_HTTP_CLIENT = None
+
+_STATS_LOCK = threading.Lock()
+_STATS = {}
+
+# HTTP statuses worth retrying: rate limiting and transient server errors
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _http_client():
+    """
+    Shared keep-alive connection pool for the Groq client.
+    """
+    global _HTTP_CLIENT
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.Client(
+            timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+    return _HTTP_CLIENT
+
+
+def _get_client(provider, model, temperature, factory):
+    key = (provider, model, temperature)
+    client = _CLIENTS.get(key)
+    if client is None:
+        with _CLIENTS_LOCK:
+            client = _CLIENTS.get(key)
+            if client is None:
+                client = factory()
+                _CLIENTS[key] = client
+                logging.info(f"Created {provider} client for {model} (temperature={temperature}).")
+    return client
+
+
+def _genai():
+    """
+    Import and configure the Gemini SDK once, with the API key (and an alternate
+    endpoint, e.g. a local stub server).
+    """
+    global _GENAI
+    if _GENAI is None:
+        with _CLIENTS_LOCK:
+            if _GENAI is None:
+                import google.generativeai as genai
+
+                if GEMINI_API_ENDPOINT:
+                    genai.configure(
+                        api_key=config.GEMINI_API_KEY,
+                        transport="rest",
+                        client_options={"api_endpoint": GEMINI_API_ENDPOINT}
+                    )
+                else:
+                    genai.configure(api_key=config.GEMINI_API_KEY)
+                _GENAI = genai
+    return _GENAI
+
+
+def _groq_client(model, temperature):
+    api_key = config.GROQ_API_KEY
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in .env file")
+
+    def factory():
+        from langchain_groq import ChatGroq
+
+        return ChatGroq(
+            api_key=api_key,
+            model=model,
+            temperature=temperature,
+            base_url=GROQ_BASE_URL,
+            timeout=LLM_TIMEOUT,
+            # Retries are handled by _call_with_retries so they are counted and logged
+            max_retries=0,
+            http_client=_http_client(),
+        )
+
+    return _get_client("groq", model, temperature, factory)
+
+
+def _gemini_client(model, temperature):
+    genai = _genai()
+    return _get_client("gemini", model, temperature, lambda: genai.GenerativeModel(
+        model,
         generation_config={"temperature": temperature}
+    ))
+
+
+def _is_retryable(error):
+    from groq import APIConnectionError
+
+    if isinstance(error, (APIConnectionError, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    # Groq errors expose `status_code`, google.api_core errors expose `code`
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    return status in _RETRYABLE_STATUS
+
+
+def _provider_stats(provider):
+    # Caller holds _STATS_LOCK
+    return _STATS.setdefault(provider, {
+        "calls": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "last_seconds": 0.0,
+        "streams": 0, "ttft_total_seconds": 0.0, "last_ttft_seconds": 0.0,
+    })
+
+
+def _record_call(provider, seconds, ok, attempts):
+    with _STATS_LOCK:
+        stats = _provider_stats(provider)
+        stats["calls"] += 1
+        stats["errors"] += 0 if ok else 1
+        stats["retries"] += attempts - 1
+        stats["total_seconds"] += seconds
+        stats["last_seconds"] = seconds
+
+
+def _record_stream(provider, ttft, seconds):
+    with _STATS_LOCK:
+        stats = _provider_stats(provider)
+        stats["streams"] += 1
+        stats["ttft_total_seconds"] += ttft
+        stats["last_ttft_seconds"] = ttft
+        stats["total_seconds"] += seconds
+        stats["last_seconds"] = seconds
+
+
+def _sizes(prefix, text, model):
+    # Span attributes for a prompt or response: UTF-8 bytes and approximate tokens
+    return {f"{prefix}_bytes": len(text.encode("utf-8")), f"{prefix}_tokens": count_tokens(text, model)}
+
+
+def _call_with_retries(provider, call, record=True):
+    """
+    Run `call()` with exponential backoff on transient failures and record its latency.
+    """
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            result = call()
+        except Exception as e:
+            if attempt > LLM_MAX_RETRIES or not _is_retryable(e):
+                _record_call(provider, time.perf_counter() - start, False, attempt)
+                raise
+            delay = LLM_RETRY_BACKOFF * 2 ** (attempt - 1) * (1 + random.random() / 2)
+            logging.warning(f"{provider} call failed ({e}); retry {attempt}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+            time.sleep(delay)
+            continue
+        if record:
+            elapsed = time.perf_counter() - start
+            _record_call(provider, elapsed, True, attempt)
+            logging.info(f"{provider} call finished in {elapsed:.2f}s")
+        else:
+            with _STATS_LOCK:
+                stats = _provider_stats(provider)
+                stats["calls"] += 1
+                stats["retries"] += attempt - 1
+        return result
+
+
+def _timed_stream(provider, open_stream, prompt, model):
+    """
+    Yield text pieces from a provider stream, logging time-to-first-token and total time.
+    Opening the stream and waiting for the first piece of text are retried like a normal
+    call; once text has been yielded, errors propagate to the caller.
+    """
+    start = time.perf_counter()
+
+    def first_piece():
+        iterator = iter(open_stream())
+        # Providers may open with empty deltas (e.g. a role-only chunk); the first
+        # token is the first piece that actually carries text
+        first = next(iterator, None)
+        while first == "":
+            first = next(iterator, None)
+        return iterator, first
+
+    iterator, first = _call_with_retries(provider, first_piece, record=False)
+    ttft = time.perf_counter() - start
+    logging.info(f"{provider} first token after {ttft:.2f}s")
+
+    pieces = []
+    if first:
+        pieces.append(first)
+        yield first
+    for piece in iterator:
+        if piece:
+            pieces.append(piece)
+            yield piece
+
+    elapsed = time.perf_counter() - start
+    _record_stream(provider, ttft, elapsed)
+    logging.info(f"{provider} stream finished in {elapsed:.2f}s (first token {ttft:.2f}s)")
+    # A generator can't hold a span open across its yields; record the timings afterwards
+    telemetry.record_span(
+        "llm.stream", elapsed, provider=provider, ttft_seconds=ttft,
+        **_sizes("prompt", prompt, model), **_sizes("response", "".join(pieces), model),
     )
-    return response.text
+
+
+def get_llm_stats():
+    """
+    Return per-provider call counts, errors, retries and latency (total, last, average).
+    """
+    with _STATS_LOCK:
+        stats = {provider: dict(values) for provider, values in _STATS.items()}
+    for values in stats.values():
+        values["avg_seconds"] = values["total_seconds"] / values["calls"] if values["calls"] else 0.0
+        values["avg_ttft_seconds"] = (
+            values["ttft_total_seconds"] / values["streams"] if values["streams"] else 0.0
+        )
+    return stats
+
+
+def gemini_generate(prompt, model=DEFAULT_GEMINI_MODEL, temperature=0.2):
+    model_instance = _gemini_client(model, temperature)
+    with telemetry.span("llm.generate", provider="gemini", model=model, **_sizes("prompt", prompt, model)) as span:
+        response = _call_with_retries("gemini", lambda: model_instance.generate_content(
+            prompt,
+            request_options={"timeout": LLM_TIMEOUT}
+        ))
+        span.set(**_sizes("response", response.text, model))
+        return response.text
 
 
 def groq_generate(prompt, model=DEFAULT_GROQ_MODEL, temperature=0.2):
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY not found in .env file")
+    from langchain_core.messages import HumanMessage
 
-    model_instance = ChatGroq(
-        api_key=GROQ_API_KEY,
-        model=model,
-        temperature=temperature
-    )
+    model_instance = _groq_client(model, temperature)
+    with telemetry.span("llm.generate", provider="groq", model=model, **_sizes("prompt", prompt, model)) as span:
+        response = _call_with_retries("groq", lambda: model_instance.invoke([HumanMessage(content=prompt)]))
+        span.set(**_sizes("response", response.content, model))
+        return response.content
+
+
+def _gemini_pieces(response):
+    for chunk in response:
+        try:
+            yield chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. only safety metadata) are skipped
+            continue
+
+
+def gemini_stream(prompt, model=DEFAULT_GEMINI_MODEL, temperature=0.2):
+    """
+    Stream a Gemini response as text pieces.
+    """
+    model_instance = _gemini_client(model, temperature)
+    return _timed_stream("gemini", lambda: _gemini_pieces(model_instance.generate_content(
+        prompt,
+        stream=True,
+        request_options={"timeout": LLM_TIMEOUT}
+    )), prompt, model)
+
+
+def groq_stream(prompt, model=DEFAULT_GROQ_MODEL, temperature=0.2):
+    """
+    Stream a Groq response as text pieces.
+    """
+    from langchain_core.messages import HumanMessage
 
-    response = model_instance.invoke([HumanMessage(content=prompt)])
-    return response.content
+    model_instance = _groq_client(model, temperature)
+    return _timed_stream("groq", lambda: (
+        chunk.content for chunk in model_instance.stream([HumanMessage(content=prompt)])
+    ), prompt, model)
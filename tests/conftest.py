@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the project modules (config, core, models, utils, benchmarks) importable
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir)))
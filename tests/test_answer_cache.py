@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from utils import answer_cache
+from utils.cache import LRUCache
+
+SCOPE = ("doc", "Analyzer", "Concise", "Groq")
+
+
+def unit(angle):
+    # Unit vectors in the plane: cosine similarity is cos(angle difference)
+    return np.array([np.cos(angle), np.sin(angle)], dtype=np.float32)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("utils.cache.time.monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(answer_cache, "ANSWER_CACHE_MAX_ENTRIES", 2)
+    monkeypatch.setattr(answer_cache, "_ANSWERS", LRUCache(max_entries=2, ttl=60))
+    monkeypatch.setattr(answer_cache, "_SCOPES", {})
+    monkeypatch.setattr(answer_cache, "_VECTOR_COUNT", 0)
+    monkeypatch.setattr(answer_cache, "_STATS", {"hits": 0, "misses": 0})
+
+
+def test_lookup_honours_the_similarity_threshold():
+    answer_cache.store(SCOPE, "Can I cancel?", unit(0.0), "Yes, any time.")
+
+    assert answer_cache.lookup(SCOPE, unit(0.0), threshold=0.95) == "Yes, any time."
+    # cos(0.3) ~ 0.955, cos(0.5) ~ 0.878
+    assert answer_cache.lookup(SCOPE, unit(0.3), threshold=0.95) == "Yes, any time."
+    assert answer_cache.lookup(SCOPE, unit(0.5), threshold=0.95) is None
+    assert answer_cache.lookup(SCOPE, unit(0.5), threshold=0.85) == "Yes, any time."
+    assert answer_cache.lookup(("other",) + SCOPE[1:], unit(0.0)) is None
+
+    stats = answer_cache.get_answer_cache_stats()
+    assert (stats["hits"], stats["misses"]) == (3, 2)
+
+
+def test_lookup_returns_the_most_similar_answer():
+    answer_cache.store(SCOPE, "Can I cancel?", unit(0.0), "cancel")
+    answer_cache.store(SCOPE, "Are there fees?", unit(0.2), "fees")
+
+    assert answer_cache.lookup(SCOPE, unit(0.15), threshold=0.9) == "fees"
+
+
+def test_expired_answer_drops_its_vector(clock):
+    answer_cache.store(SCOPE, "Can I cancel?", unit(0.0), "Yes.")
+    clock[0] += 61
+
+    assert answer_cache.lookup(SCOPE, unit(0.0)) is None
+    assert answer_cache._SCOPES == {}
+    assert answer_cache._VECTOR_COUNT == 0
+
+
+def test_storing_a_question_again_does_not_count_twice():
+    answer_cache.store(SCOPE, "Can I cancel?", unit(0.0), "Yes.")
+    answer_cache.store(SCOPE, "  can i CANCEL?", unit(0.0), "Yes, any time.")
+
+    assert answer_cache._VECTOR_COUNT == 1
+    assert answer_cache.lookup(SCOPE, unit(0.0)) == "Yes, any time."
+
+
+def test_vectors_are_pruned_across_scopes():
+    # One question per document: no single scope ever outgrows the cache
+    for i in range(5):
+        answer_cache.store((f"doc{i}",) + SCOPE[1:], "Can I cancel?", unit(0.0), f"answer {i}")
+
+    # The fifth store crossed 2 * ANSWER_CACHE_MAX_ENTRIES and pruned every evicted answer
+    assert answer_cache._VECTOR_COUNT == 2
+    assert sorted(scope[0] for scope in answer_cache._SCOPES) == ["doc3", "doc4"]
+    assert answer_cache.lookup(("doc4",) + SCOPE[1:], unit(0.0)) == "answer 4"
+
+
+def test_clear_forgets_everything():
+    answer_cache.store(SCOPE, "Can I cancel?", unit(0.0), "Yes.")
+    answer_cache.clear_answer_cache()
+
+    assert answer_cache.lookup(SCOPE, unit(0.0)) is None
+    assert answer_cache._VECTOR_COUNT == 0
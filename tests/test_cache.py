@@ -0,0 +1,47 @@
+from utils.cache import LRUCache
+
+
+def test_evicts_least_recently_used_entry():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evicts_by_size_but_keeps_the_newest_entry():
+    cache = LRUCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.put("a", "xxxx")
+    cache.put("b", "xxxx")
+    cache.put("c", "xxxx")
+    assert cache.keys() == ["b", "c"]
+    assert cache.stats()["resident_bytes"] == 8
+
+    cache.put("big", "x" * 50)
+    assert cache.keys() == ["big"]
+
+
+def test_expired_entries_are_misses(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("utils.cache.time.monotonic", lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.put("a", 1)
+    now[0] += 11
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 1
+
+
+def test_pop_and_replace_update_size():
+    cache = LRUCache(max_bytes=100, sizeof=len)
+    cache.put("a", "xxx")
+    cache.put("a", "xxxxx")
+    assert cache.stats()["resident_bytes"] == 5
+    assert cache.pop("a") == "xxxxx"
+    assert cache.pop("a") is None
+    assert cache.stats()["resident_bytes"] == 0
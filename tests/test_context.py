@@ -0,0 +1,37 @@
+from utils.context import count_tokens, pack_context, strip_overlap
+
+MODEL = "llama-3.1-8b-instant"
+
+OVERLAP = "the provider may terminate the account"
+FIRST = "Section 9. Termination. Without notice " + OVERLAP
+SECOND = OVERLAP + " and delete all stored data within thirty days."
+
+
+def test_strip_overlap_removes_repeated_prefix():
+    assert strip_overlap(FIRST, SECOND) == "and delete all stored data within thirty days."
+    assert strip_overlap(FIRST, "Unrelated text.") == "Unrelated text."
+
+
+def test_pack_context_strips_overlap_between_adjacent_chunks():
+    context, stats = pack_context([FIRST, SECOND], MODEL, max_tokens=1000)
+
+    assert context.count(OVERLAP) == 1
+    assert context == FIRST + "\n" + "and delete all stored data within thirty days."
+    assert stats["chunks_used"] == 2
+
+
+def test_pack_context_strips_overlap_when_the_later_chunk_ranks_first():
+    context, _ = pack_context([SECOND, FIRST], MODEL, max_tokens=1000)
+
+    assert context.count(OVERLAP) == 1
+    assert context.startswith(SECOND)
+
+
+def test_pack_context_drops_duplicates_and_respects_the_budget():
+    chunks = [FIRST, FIRST, "x " * 500, "Short clause."]
+    budget = count_tokens(FIRST, MODEL) + count_tokens("\n", MODEL) + count_tokens("Short clause.", MODEL)
+
+    context, stats = pack_context(chunks, MODEL, max_tokens=budget)
+
+    assert context == FIRST + "\n" + "Short clause."
+    assert stats == {"context_tokens": budget, "chunks_used": 2, "chunks_dropped": 2}
@@ -0,0 +1,56 @@
+import io
+
+import docx
+from docx.enum.text import WD_BREAK
+
+from utils.document_loader import iter_docx_pages
+
+
+def _docx(build):
+    document = docx.Document()
+    build(document)
+    data = io.BytesIO()
+    document.save(data)
+    data.seek(0)
+    return data
+
+
+def _rendered_break(paragraph):
+    # Word writes one at the top of each page it laid out
+    run = paragraph.runs[0]._r
+    run.insert(0, run.makeelement(docx.oxml.ns.qn("w:lastRenderedPageBreak"), {}))
+
+
+def test_page_break_at_paragraph_end_starts_the_next_page():
+    def build(document):
+        document.add_paragraph("First page.")
+        document.add_paragraph("Still first page.").runs[0].add_break(WD_BREAK.PAGE)
+        _rendered_break(document.add_paragraph("Second page."))
+        _rendered_break(document.add_paragraph("Third page."))
+
+    assert list(iter_docx_pages(_docx(build))) == [
+        (1, "First page.\nStill first page."),
+        (2, "Second page."),
+        (3, "Third page."),
+    ]
+
+
+def test_page_break_inside_a_paragraph_splits_it():
+    def build(document):
+        paragraph = document.add_paragraph("Before the break.")
+        paragraph.runs[0].add_break(WD_BREAK.PAGE)
+        paragraph.add_run("After the break.")
+        document.add_paragraph("More of page two.")
+
+    assert list(iter_docx_pages(_docx(build))) == [
+        (1, "Before the break."),
+        (2, "After the break.\nMore of page two."),
+    ]
+
+
+def test_document_without_breaks_is_one_page():
+    def build(document):
+        document.add_paragraph("One.")
+        document.add_paragraph("Two.\tTabbed.")
+
+    assert list(iter_docx_pages(_docx(build))) == [(1, "One.\nTwo.\tTabbed.")]
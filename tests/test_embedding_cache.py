@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+
+import numpy as np
+import pytest
+
+from utils import embedding_cache
+
+MODEL = "test-model"
+
+
+class CountingEmbeddings:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(t)), 1.0] for t in texts]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(embedding_cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache" / "embeddings.sqlite3")
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_PATH", path)
+    monkeypatch.setattr(embedding_cache, "_LOCAL", threading.local())
+    monkeypatch.setattr(embedding_cache, "_ROWS", None)
+    yield path
+    conn = getattr(embedding_cache._LOCAL, "conn", None)
+    if conn is not None:
+        conn.close()
+
+
+def _hashes(path):
+    with sqlite3.connect(path) as conn:
+        return {h for (h,) in conn.execute("SELECT chunk_hash FROM embeddings")}
+
+
+def test_cached_chunks_skip_the_model(db):
+    embeddings = CountingEmbeddings()
+    first = embedding_cache.embed_with_cache(["alpha", "beta", "alpha"], embeddings, MODEL)
+    second = embedding_cache.embed_with_cache(["beta", "gamma", "alpha"], embeddings, MODEL)
+
+    assert embeddings.calls == [["alpha", "beta"], ["gamma"]]
+    np.testing.assert_array_equal(second[0], first[1])
+    np.testing.assert_array_equal(second[2], first[0])
+    # Vectors are cached per model
+    embedding_cache.embed_with_cache(["alpha"], embeddings, "other-model")
+    assert embeddings.calls[-1] == ["alpha"]
+
+
+def test_trim_removes_least_recently_used_rows(db, clock):
+    for name in ("old", "middle", "new"):
+        embedding_cache.put_vectors(MODEL, [name], [[1.0]])
+        clock[0] += 10
+
+    assert embedding_cache.trim(2) == 2
+    assert _hashes(db) == {"middle", "new"}
+
+
+def test_hit_refreshes_last_used(db, clock):
+    embedding_cache.put_vectors(MODEL, ["old"], [[1.0]])
+    clock[0] += 10
+    embedding_cache.put_vectors(MODEL, ["new"], [[1.0]])
+    clock[0] += embedding_cache._TOUCH_INTERVAL + 1
+
+    assert set(embedding_cache.get_vectors(MODEL, ["old"])) == {"old"}
+    embedding_cache.trim(1)
+    assert _hashes(db) == {"old"}
+
+
+def test_inserts_trim_once_over_the_slack(db, monkeypatch, clock):
+    monkeypatch.setattr(embedding_cache, "EMBEDDING_CACHE_MAX_ENTRIES", 10)
+    embedding_cache.put_vectors(MODEL, [f"h{i}" for i in range(11)], [[1.0]] * 11)
+    clock[0] += 10
+    # 11 rows is within the 10% slack
+    assert embedding_cache._ROWS == 11
+    assert len(_hashes(db)) == 11
+
+    embedding_cache.put_vectors(MODEL, ["h11"], [[1.0]])
+    assert embedding_cache._ROWS == 10
+    assert len(_hashes(db)) == 10
+    assert "h11" in _hashes(db)
+
+
+def test_cache_without_last_used_is_migrated(db, tmp_path):
+    (tmp_path / "cache").mkdir()
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE embeddings (model TEXT NOT NULL, chunk_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL, PRIMARY KEY (model, chunk_hash))"
+        )
+        conn.execute("INSERT INTO embeddings VALUES (?, ?, ?)", (MODEL, "legacy", np.float32([2.0]).tobytes()))
+    conn.close()
+
+    assert embedding_cache.get_vectors(MODEL, ["legacy"])["legacy"].tolist() == [2.0]
+    embedding_cache.put_vectors(MODEL, ["fresh"], [[1.0]])
+    # Rows from before the cap count as least recently used
+    embedding_cache.trim(1)
+    assert _hashes(db) == {"fresh"}
@@ -0,0 +1,12 @@
+import pytest
+
+from benchmarks.bench_import_time import DEFAULT_BUDGET_MS, heavy_imports, import_times, total_ms
+
+
+@pytest.mark.parametrize("module", ["core.pipeline", "batch"])
+def test_cold_import_is_light(module):
+    # Fastest of a few runs, as the benchmark does, to ride out a noisy machine
+    entries = min((import_times(module) for _ in range(3)), key=total_ms)
+
+    assert heavy_imports(entries) == []
+    assert total_ms(entries) < DEFAULT_BUDGET_MS
@@ -0,0 +1,92 @@
+import httpx
+import pytest
+
+from benchmarks.stub_server import StubHandler, start_stub_server
+from config import config
+from models import llm
+
+
+class StatusError(Exception):
+    # Shaped like the provider SDK errors _is_retryable inspects
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    monkeypatch.setattr(StubHandler, "request_count", 0)
+    monkeypatch.setattr(llm, "LLM_RETRY_BACKOFF", 0)
+    monkeypatch.setattr(llm, "_STATS", {})
+    servers = []
+
+    def start(**kwargs):
+        server = start_stub_server(**kwargs)
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _post(client, url):
+    def call():
+        response = client.post(url, json={"model": "stub", "messages": []})
+        if response.status_code >= 400:
+            raise StatusError(response.status_code)
+        return response.json()["choices"][0]["message"]["content"]
+    return call
+
+
+def test_call_with_retries_recovers_from_transient_failures(stub):
+    base_url = stub(fail_every=2)
+    with httpx.Client() as client:
+        call = _post(client, f"{base_url}/openai/v1/chat/completions")
+        assert call()  # first request succeeds; the next one gets a 503
+        assert llm._call_with_retries("groq", call) == StubHandler.reply
+
+    stats = llm.get_llm_stats()["groq"]
+    assert stats["calls"] == 1
+    assert stats["retries"] == 1
+    assert stats["errors"] == 0
+    assert StubHandler.request_count == 3
+
+
+def test_call_with_retries_gives_up_on_non_retryable_errors(stub):
+    base_url = stub()
+    with httpx.Client() as client:
+        with pytest.raises(StatusError) as error:
+            llm._call_with_retries("groq", _post(client, f"{base_url}/unknown"))
+
+    assert error.value.status_code == 404
+    stats = llm.get_llm_stats()["groq"]
+    assert stats["errors"] == 1
+    assert stats["retries"] == 0
+    assert StubHandler.request_count == 1
+
+
+def test_call_with_retries_stops_after_max_retries(stub, monkeypatch):
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 2)
+    base_url = stub(fail_every=1)
+    with httpx.Client() as client:
+        with pytest.raises(StatusError):
+            llm._call_with_retries("groq", _post(client, f"{base_url}/openai/v1/chat/completions"))
+
+    assert llm.get_llm_stats()["groq"]["retries"] == 2
+    assert StubHandler.request_count == 3
+
+
+def test_groq_generate_reuses_one_pooled_client(stub, monkeypatch):
+    monkeypatch.setattr(llm, "GROQ_BASE_URL", stub())
+    monkeypatch.setattr(config, "GROQ_API_KEY", "stub-key", raising=False)
+    monkeypatch.setattr(llm, "_CLIENTS", {})
+    monkeypatch.setattr(llm, "_HTTP_CLIENT", None)
+
+    answers = [llm.groq_generate("What can I cancel?", model="stub-model", temperature=0.1) for _ in range(2)]
+
+    assert answers == [StubHandler.reply, StubHandler.reply]
+    assert list(llm._CLIENTS) == [("groq", "stub-model", 0.1)]
+    assert llm._CLIENTS["groq", "stub-model", 0.1].http_client is llm._HTTP_CLIENT
+    assert llm.get_llm_stats()["groq"]["calls"] == 2
+    assert StubHandler.request_count == 2
@@ -0,0 +1,65 @@
+import numpy as np
+
+from utils.lexical import LexicalIndex, tokenize
+from utils.retrieval import fuse, mmr, top_k
+
+CHUNKS = [
+    "You may cancel your subscription at any time from the account page.",
+    "Refunds are issued within 14 days of cancellation under section 12.3.",
+    "We share your data with advertising partners.",
+    "Arbitration: disputes are resolved by binding arbitration.",
+]
+
+
+def test_tokenize_keeps_section_numbers():
+    assert tokenize("See Section 12.3, then 4.") == ["see", "section", "12.3", "then", "4"]
+
+
+def test_lexical_index_ranks_matching_chunks():
+    index = LexicalIndex.build(CHUNKS)
+    scores = index.scores("refund after cancellation")
+
+    assert int(np.argmax(scores)) == 1
+    assert scores[2] == 0
+
+
+def test_lexical_index_save_load_round_trip(tmp_path):
+    index = LexicalIndex.build(CHUNKS)
+    path = tmp_path / "lexical.npz"
+    index.save(path)
+    loaded = LexicalIndex.load(path)
+
+    assert loaded.vocab == index.vocab
+    assert loaded.n_docs == index.n_docs
+    for query in ("binding arbitration", "section 12.3", "data partners", "missing"):
+        np.testing.assert_allclose(loaded.scores(query), index.scores(query))
+
+
+def test_top_k_returns_best_first():
+    assert top_k(np.array([0.1, 0.9, 0.5, 0.7]), 2).tolist() == [1, 3]
+    assert top_k(np.array([0.1]), 5).tolist() == [0]
+    assert top_k(np.array([]), 3).tolist() == []
+
+
+def test_fuse_prefers_candidates_ranked_by_both():
+    ids, scores = fuse([3, 1, 2], [1, 0], n_docs=5, dense_weight=0.5)
+
+    assert ids[0] == 1
+    assert set(ids.tolist()) == {0, 1, 2, 3}
+    assert np.all(np.diff(scores) <= 0)
+
+
+def test_fuse_weights_the_dense_ranking():
+    ids, _ = fuse([0], [1], n_docs=2, dense_weight=0.9)
+    assert ids.tolist() == [0, 1]
+    ids, _ = fuse([0], [1], n_docs=2, dense_weight=0.1)
+    assert ids.tolist() == [1, 0]
+
+
+def test_mmr_skips_near_duplicates():
+    vectors = np.array([[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]], dtype=np.float32)
+    relevance = np.array([1.0, 0.95, 0.5], dtype=np.float32)
+
+    assert mmr(vectors, relevance, k=2, lambda_mult=0.5) == [0, 2]
+    assert mmr(vectors, relevance, k=2, lambda_mult=1.0) == [0, 1]
+    assert mmr(vectors[:0], relevance[:0], k=2) == []
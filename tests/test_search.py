@@ -0,0 +1,70 @@
+import threading
+
+import pytest
+
+from utils import search
+
+
+@pytest.fixture
+def backend():
+    calls = []
+    lock = threading.Lock()
+
+    def fake(query, max_results):
+        with lock:
+            calls.append(query)
+        return [
+            {"url": f"https://example.com/{query}/{i}", "content": f"{query} result {i}"}
+            for i in range(max_results)
+        ]
+
+    search.set_search_backend(fake)
+    yield calls
+    search.set_search_backend(None)
+
+
+def test_normalize_query_ignores_case_punctuation_and_filler():
+    assert search.normalize_query("What is the Refund policy?") == search.normalize_query("refund policy")
+
+
+def test_repeated_query_is_served_from_cache(backend):
+    first = search.search_results("refund policy")
+    calls = len(backend)
+    second = search.search_results("What is the refund policy?")
+
+    assert second == first
+    assert len(backend) == calls
+    assert search.get_search_cache_stats()["hits"] >= len(search.reformulate("refund policy"))
+
+
+def test_reformulations_are_searched_concurrently_and_merged(backend):
+    results = search.search_results("refund policy", max_results=100)
+
+    assert sorted(backend) == sorted(search.reformulate("refund policy"))
+    urls = [r["url"] for r in results]
+    assert len(urls) == len(set(urls))
+    # Interleaved by rank: the top result of each query comes first
+    assert {r["url"].rsplit("/", 1)[1] for r in results[:len(backend)]} == {"0"}
+
+
+def test_merge_drops_duplicate_urls_and_empty_results():
+    a = [{"url": "u1", "content": "one"}, {"url": "u2", "content": "two"}]
+    b = [{"url": "u1", "content": "one again"}, {"url": "u3", "content": ""}, {"url": "u4", "content": "four"}]
+
+    merged = search._merge([a, b], limit=10)
+
+    assert [r["url"] for r in merged] == ["u1", "u2", "u4"]
+    assert search._merge([a, b], limit=2) == merged[:2]
+
+
+def test_failed_query_variant_does_not_fail_the_search():
+    def flaky(query, max_results):
+        if query != "refund policy":
+            raise ConnectionError("down")
+        return [{"url": "u1", "content": "refunds"}]
+
+    search.set_search_backend(flaky)
+    try:
+        assert [r["url"] for r in search.search_results("refund policy")] == ["u1"]
+    finally:
+        search.set_search_backend(None)
@@ -0,0 +1,51 @@
+import faiss
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from utils import ann, vectorstore
+from utils.textstore import write_text_store
+from utils.vectorstore import _PageStream, document_id
+
+PAGES = [
+    (1, "Terms  of\tService\n\nSection 1. You must be 18."),
+    (2, ""),
+    (3, "   \n"),
+    (4, "Section 2. Fees are non-refundable.  "),
+]
+
+
+@pytest.mark.parametrize("pages", [PAGES, PAGES[:1], [(1, "")]])
+def test_page_stream_doc_id_matches_joined_text(pages):
+    stream = _PageStream(iter(pages), preview_chars=1000)
+
+    assert list(stream) == pages
+    assert stream.doc_id == document_id("\n".join(text for _, text in pages))
+
+
+def test_page_stream_preview_is_bounded():
+    stream = _PageStream(iter(PAGES), preview_chars=20)
+    list(stream)
+
+    assert stream.preview == PAGES[0][1][:20]
+
+
+@pytest.mark.parametrize("index_type, options", [
+    ("flat", {}),
+    ("hnsw", {}),
+    ("ivf", {"pq_m": 0}),
+    ("ivf", {"pq_m": 4}),
+])
+def test_saved_index_is_memory_mapped(tmp_path, monkeypatch, index_type, options):
+    monkeypatch.setattr(vectorstore, "get_embeddings_model", lambda: None)
+    vectors = np.random.default_rng(0).random((1000, 16), dtype=np.float32)
+    faiss.write_index(ann.build_index(vectors, index_type, **options), str(tmp_path / vectorstore.FAISS_FILE))
+    write_text_store(str(tmp_path), [Document(page_content=f"chunk {i}") for i in range(len(vectors))])
+
+    vectordb = vectorstore._open_saved_index(str(tmp_path))
+
+    assert vectordb.vectors_mapped
+    assert vectordb.index.ntotal == len(vectors)
+    _, ids = vectordb.index.search(vectors[:1], 1)
+    assert ids[0][0] == 0
+    assert vectordb.docstore.search("7").page_content == "chunk 7"
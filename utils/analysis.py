@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import threading
+import time
+
+from config.config import (
+    ANALYSIS_CONCURRENCY, ANALYSIS_REQUESTS_PER_MINUTE, ANALYSIS_SECTION_TOKENS,
+    ANALYSIS_MAX_SECTION_TOKENS, ANALYSIS_MAX_SECTIONS, MODEL_NAMES,
+)
+from utils import prompts
+from utils.context import count_tokens, strip_overlap, token_budget, truncate_to_tokens
+
+# Per-provider token buckets shared by all runs in the process: (tokens, last refill time)
+_BUCKETS = {}
+_SLOT_LOCK = threading.Lock()
+
+
+async def _wait_for_slot(provider):
+    """
+    Keep requests to a provider under its requests-per-minute limit with a token
+    bucket: up to ANALYSIS_CONCURRENCY requests go out at once, after which they are
+    spaced at the sustained rate.
+    """
+    rpm = ANALYSIS_REQUESTS_PER_MINUTE.get(provider)
+    if not rpm:
+        return
+    rate = rpm / 60.0
+    burst = max(1, ANALYSIS_CONCURRENCY.get(provider, 1))
+    with _SLOT_LOCK:
+        now = time.monotonic()
+        tokens, last = _BUCKETS.get(provider, (burst, now))
+        # Take a token now; a negative balance is the queue of callers waiting for refills
+        tokens = min(burst, tokens + (now - last) * rate) - 1
+        _BUCKETS[provider] = (tokens, now)
+    if tokens < 0:
+        await asyncio.sleep(-tokens / rate)
+
+
+def _sections(chunks, max_tokens, model, overlapping=False):
+    """
+    Group consecutive chunks into sections of at most `max_tokens` tokens. With
+    `overlapping`, the splitter overlap between neighbouring chunks is dropped.
+    """
+    sections, current, size = [], [], 0
+    previous = ""
+    for chunk in chunks:
+        text = strip_overlap(previous, chunk) if overlapping else chunk
+        previous = chunk
+        tokens = count_tokens(text, model)
+        if current and size + tokens > max_tokens:
+            sections.append("\n".join(current))
+            current, size = [], 0
+        current.append(text)
+        size += tokens
+    if current:
+        sections.append("\n".join(current))
+    return sections
+
+
+def _section_tokens(chunks, model):
+    # Grow sections for very long documents so the map step stays within ANALYSIS_MAX_SECTIONS
+    # calls, but never past what the model's context window can take
+    total = sum(count_tokens(chunk, model) for chunk in chunks)
+    limit = token_budget(model, ANALYSIS_MAX_SECTION_TOKENS)
+    return min(limit, max(ANALYSIS_SECTION_TOKENS, total // ANALYSIS_MAX_SECTIONS + 1))
+
+
+class _Analyzer:
+    """
+    Runs the LLM passes of one analysis, bounded by the provider's concurrency limit.
+    """
+
+    def __init__(self, llm_generate, provider):
+        self.llm_generate = llm_generate
+        self.provider = provider
+        self.model = MODEL_NAMES.get(provider)
+        self.semaphore = asyncio.Semaphore(ANALYSIS_CONCURRENCY.get(provider, 4))
+        self.prompt_tokens = 0
+
+    async def call(self, prompt):
+        self.prompt_tokens += count_tokens(prompt, self.model)
+        async with self.semaphore:
+            await _wait_for_slot(self.provider)
+            result = await asyncio.to_thread(self.llm_generate, prompt)
+        return result.strip()
+
+    async def summarize(self, chunks, detail_level):
+        """
+        Map-reduce summary: summarize sections in parallel, then combine the partial
+        summaries (repeatedly, if they are still too long) into the final summary.
+        """
+        section_tokens = _section_tokens(chunks, self.model)
+        sections = _sections(chunks, section_tokens, self.model, overlapping=True)
+        while len(sections) > 1:
+            logging.info(f"Summarizing {len(sections)} sections in parallel.")
+            partials = await asyncio.gather(*(
+                self.call(prompts.SECTION_SUMMARY_PROMPT.format(context=section))
+                for section in sections
+            ))
+            reduced = _sections(partials, section_tokens, self.model)
+            # Guard against partial summaries that don't shrink: combine them in one final pass
+            sections = reduced if len(reduced) < len(sections) else ["\n".join(partials)]
+
+        return await self.call(prompts.SUMMARY_PROMPT.format(
+            context=sections[0] if sections else "",
+            question="Summarize this document for a user.",
+            detail_level=detail_level.lower()
+        ))
+
+    async def company_name(self, head_text):
+        head = truncate_to_tokens(head_text, ANALYSIS_SECTION_TOKENS, self.model)
+        name = await self.call(prompts.COMPANY_NAME_PROMPT.format(context=head))
+        name = name.strip().strip('"*').splitlines()[0] if name.strip() else ""
+        if not name or name.upper() == "UNKNOWN" or len(name) > 100:
+            return _first_line_name(head_text)
+        return name
+
+    async def risky_clauses(self, sections):
+        results = await asyncio.gather(*(
+            self.call(prompts.RISK_PROMPT.format(context=section)) for section in sections
+        ))
+        return _risk_lines(results)
+
+    async def summary_and_risks(self, section, detail_level):
+        """
+        One pass for documents that fit in a single section: the summary and the
+        risky clauses come from the same read of the text.
+        """
+        reply = await self.call(prompts.SUMMARY_WITH_RISKS_PROMPT.format(
+            context=section,
+            question="Summarize this document for a user.",
+            detail_level=detail_level.lower()
+        ))
+        summary, _, risks = reply.partition(prompts.RISKS_MARKER)
+        return summary.strip(), _risk_lines([risks])
+
+
+def _risk_lines(results):
+    """
+    Deduplicated '- ' bullet lines from risk pass replies.
+    """
+    risks = []
+    for result in results:
+        for line in result.splitlines():
+            line = line.strip()
+            if line.startswith("- ") and line not in risks:
+                risks.append(line)
+    return "\n".join(risks)
+
+
+def _first_line_name(text):
+    """
+    Fallback document name: the first reasonably long line of the text.
+    """
+    for line in text.split("\n")[:10]:
+        if len(line.strip()) > 5:
+            return line.strip()
+    return "the document"
+
+
+async def analyze_document(chunks, head_text, llm_generate, provider, detail_level):
+    """
+    Run the summary, company-name and risky-clause passes concurrently.
+    """
+    analyzer = _Analyzer(llm_generate, provider)
+    sections = _sections(chunks, _section_tokens(chunks, analyzer.model), analyzer.model, overlapping=True)
+    if len(sections) <= 1:
+        # Short document: summarizing and looking for risks would read the same text twice
+        combined, company_name = await asyncio.gather(
+            analyzer.summary_and_risks(sections[0] if sections else "", detail_level),
+            analyzer.company_name(head_text),
+            return_exceptions=True,
+        )
+        if isinstance(combined, Exception):
+            raise combined
+        summary, risks = combined
+    else:
+        summary, company_name, risks = await asyncio.gather(
+            analyzer.summarize(chunks, detail_level),
+            analyzer.company_name(head_text),
+            analyzer.risky_clauses(sections),
+            return_exceptions=True,
+        )
+    if isinstance(summary, Exception):
+        raise summary
+    if isinstance(company_name, Exception):
+        logging.warning(f"Company name pass failed: {company_name}")
+        company_name = _first_line_name(head_text)
+    if isinstance(risks, Exception):
+        logging.warning(f"Risky clause pass failed: {risks}")
+        risks = ""
+    logging.info(f"Initial analysis sent {analyzer.prompt_tokens} prompt tokens to {analyzer.model}.")
+    return {"summary": summary, "company_name": company_name, "risks": risks}
+
+
+def run_initial_analysis(chunks, head_text, llm_generate, provider, detail_level):
+    """
+    Synchronous entry point for callers without an event loop (e.g. Streamlit).
+    """
+    start = time.perf_counter()
+    result = asyncio.run(analyze_document(chunks, head_text, llm_generate, provider, detail_level))
+    logging.info(f"Initial analysis of {len(chunks)} chunks finished in {time.perf_counter() - start:.2f}s")
+    return result
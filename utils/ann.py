@@ -0,0 +1,88 @@
+import logging
+import math
+import time
+
+import faiss
+import numpy as np
+from config.config import (
+    FAISS_INDEX_TYPE, FAISS_ANN_MIN_CHUNKS, FAISS_ANN_TYPE, FAISS_IVF_NLIST, FAISS_IVF_NPROBE,
+    FAISS_PQ_M, FAISS_HNSW_M, FAISS_HNSW_EF_CONSTRUCTION, FAISS_HNSW_EF_SEARCH,
+)
+
+# IVF training uses at most this many vectors per list (FAISS warns above 256)
+_TRAIN_POINTS_PER_LIST = 256
+
+
+def choose_index_type(n_vectors, index_type=FAISS_INDEX_TYPE):
+    """
+    Resolve "auto" to a concrete index type for a corpus of `n_vectors`.
+    """
+    if index_type != "auto":
+        return index_type
+    return FAISS_ANN_TYPE if n_vectors >= FAISS_ANN_MIN_CHUNKS else "flat"
+
+
+def build_index(vectors, index_type="flat", nlist=FAISS_IVF_NLIST, pq_m=FAISS_PQ_M,
+                hnsw_m=FAISS_HNSW_M):
+    """
+    Build (and train, where needed) a FAISS index of the given type over `vectors`,
+    preserving their order. Types: "flat", "hnsw" and "ivf" (IVF-PQ when pq_m > 0).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, d = vectors.shape
+    start = time.perf_counter()
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(d)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, hnsw_m)
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+    elif index_type == "ivf":
+        nlist = nlist or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        quantizer = faiss.IndexFlatL2(d)
+        if pq_m:
+            index = faiss.IndexIVFPQ(quantizer, d, nlist, pq_m, 8)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, d, nlist)
+        sample = vectors
+        if n > nlist * _TRAIN_POINTS_PER_LIST:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, nlist * _TRAIN_POINTS_PER_LIST, replace=False)]
+        index.train(sample)
+    else:
+        raise ValueError(f"Unknown FAISS index type: {index_type}")
+
+    index.add(vectors)
+    if index_type == "ivf":
+        # Needed for reconstruct(), which MMR uses to fetch candidate vectors
+        index.make_direct_map()
+    configure_search(index)
+    logging.info(f"Built {index_type} index over {n} vectors in {time.perf_counter() - start:.2f}s")
+    return index
+
+
+def configure_search(index, nprobe=FAISS_IVF_NPROBE, ef_search=FAISS_HNSW_EF_SEARCH):
+    """
+    Apply recall/latency search parameters to an IVF or HNSW index (no-op for flat).
+    """
+    try:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    except RuntimeError:
+        pass
+    if hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def maybe_upgrade(vectordb, index_type=FAISS_INDEX_TYPE):
+    """
+    Replace a LangChain FAISS store's flat index with an approximate one when the
+    corpus is large enough. Vector order, and so the docstore mapping, is unchanged.
+    """
+    n = vectordb.index.ntotal
+    target = choose_index_type(n, index_type)
+    if target == "flat":
+        return vectordb
+    vectors = vectordb.index.reconstruct_n(0, n)
+    vectordb.index = build_index(vectors, target)
+    return vectordb
@@ -0,0 +1,117 @@
+import logging
+import threading
+
+import numpy as np
+from config.config import (
+    EMBEDDING_MODEL_NAME, ANSWER_CACHE_SIMILARITY, ANSWER_CACHE_TTL, ANSWER_CACHE_MAX_ENTRIES,
+)
+from models.embeddings import get_embeddings_model
+from utils.cache import LRUCache
+
+# (scope, query) -> answer. Scope is (document id, mode, detail level, model).
+_ANSWERS = LRUCache(max_entries=ANSWER_CACHE_MAX_ENTRIES, ttl=ANSWER_CACHE_TTL)
+# scope -> {(scope, query): unit query vector}, scanned for near-duplicate questions
+_SCOPES = {}
+_VECTOR_COUNT = 0
+_LOCK = threading.Lock()
+_STATS = {"hits": 0, "misses": 0}
+
+
+def embed_query(query):
+    """
+    Unit-length query embedding; the same vector can be reused for retrieval.
+    """
+    vector = np.asarray(get_embeddings_model(EMBEDDING_MODEL_NAME).embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def lookup(scope, query_vector, threshold=ANSWER_CACHE_SIMILARITY):
+    """
+    Return the cached answer for the most similar earlier question in `scope`
+    if its cosine similarity is at least `threshold`, else None.
+    """
+    with _LOCK:
+        candidates = list(_SCOPES.get(scope, {}).items())
+    if not candidates:
+        _count("misses")
+        return None
+
+    keys = [key for key, _ in candidates]
+    similarities = np.vstack([vector for _, vector in candidates]) @ query_vector
+    for i in np.argsort(-similarities):
+        if similarities[i] < threshold:
+            break
+        answer = _ANSWERS.get(keys[i])
+        if answer is None:
+            # Expired or evicted from the LRU; forget its vector too
+            with _LOCK:
+                _forget(scope, keys[i])
+            continue
+        _count("hits")
+        logging.info(f"Answer cache hit (similarity {similarities[i]:.3f}).")
+        return answer
+
+    _count("misses")
+    return None
+
+
+def _count(outcome):
+    with _LOCK:
+        _STATS[outcome] += 1
+
+
+def store(scope, query, query_vector, answer):
+    """
+    Cache an answer for a question within `scope`.
+    """
+    global _VECTOR_COUNT
+    key = (scope, query.strip().lower())
+    _ANSWERS.put(key, answer)
+    with _LOCK:
+        vectors = _SCOPES.setdefault(scope, {})
+        if key not in vectors:
+            _VECTOR_COUNT += 1
+        vectors[key] = query_vector
+        # The LRU bounds answers across all scopes; once the vectors outnumber it
+        # twice over, drop every vector (and scope) whose answer has been evicted
+        if _VECTOR_COUNT > 2 * ANSWER_CACHE_MAX_ENTRIES:
+            for other in list(_SCOPES):
+                for stale in [k for k in _SCOPES[other] if k not in _ANSWERS]:
+                    _forget(other, stale)
+
+
+def _forget(scope, key):
+    # Caller holds _LOCK
+    global _VECTOR_COUNT
+    vectors = _SCOPES.get(scope)
+    if vectors is None or vectors.pop(key, None) is None:
+        return
+    _VECTOR_COUNT -= 1
+    if not vectors:
+        del _SCOPES[scope]
+
+
+def clear_answer_cache():
+    """
+    Forget every cached answer.
+    """
+    global _VECTOR_COUNT
+    _ANSWERS.clear()
+    with _LOCK:
+        _SCOPES.clear()
+        _VECTOR_COUNT = 0
+
+
+def get_answer_cache_stats():
+    """
+    Return answer cache hit/miss counts, hit rate and entry count.
+    """
+    with _LOCK:
+        stats = dict(_STATS)
+    lookups = stats["hits"] + stats["misses"]
+    return {
+        **stats,
+        "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+        "entries": len(_ANSWERS),
+    }
@@ -0,0 +1,146 @@
+import logging
+import threading
+
+from config.config import (
+    CHUNK_OVERLAP, MODEL_CONTEXT_WINDOWS, CONTEXT_RESERVED_TOKENS, DEFAULT_CONTEXT_WINDOW,
+)
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to a character-based estimate
+    tiktoken = None
+
+# model -> tiktoken encoding, or None when no encoding could be loaded (use the estimate)
+_ENCODINGS = {}
+_ENCODINGS_LOCK = threading.Lock()
+# Encoding for models tiktoken doesn't know. Neither Llama 3 nor Gemini ships a
+# tiktoken encoding; cl100k is a close proxy.
+_FALLBACK_ENCODING = "cl100k_base"
+
+# Shortest shared prefix/suffix treated as chunk overlap rather than coincidence
+_MIN_OVERLAP = 16
+
+
+def _load_encoding(model):
+    try:
+        if model:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                pass
+        return tiktoken.get_encoding(_FALLBACK_ENCODING)
+    except Exception as e:
+        # BPE files are downloaded on first use, which fails on offline hosts
+        logging.warning(f"Could not load a tiktoken encoding for {model} ({e}); estimating tokens.")
+        return None
+
+
+def _encoding(model=None):
+    """
+    Tokenizer for `model`, or None to fall back to the character-based estimate.
+    """
+    if tiktoken is None:
+        return None
+    if model not in _ENCODINGS:
+        with _ENCODINGS_LOCK:
+            if model not in _ENCODINGS:
+                _ENCODINGS[model] = _load_encoding(model)
+    return _ENCODINGS[model]
+
+
+def count_tokens(text, model=None):
+    """
+    Approximate number of tokens `text` costs for `model`: exact for models tiktoken
+    knows, a cl100k count otherwise, and about four characters per token without tiktoken.
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    # About four characters per token for English prose
+    return len(text) // 4 + 1
+
+
+def context_window(model):
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def token_budget(model, cap=None):
+    """
+    Tokens available for context in a prompt to `model`, optionally capped.
+    """
+    budget = context_window(model) - CONTEXT_RESERVED_TOKENS
+    return min(budget, cap) if cap else budget
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    """
+    Cut `text` down to at most `max_tokens` tokens.
+    """
+    encoding = _encoding(model)
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return text if len(tokens) <= max_tokens else encoding.decode(tokens[:max_tokens])
+    return text[:max_tokens * 4]
+
+
+def strip_overlap(previous, text, max_overlap=CHUNK_OVERLAP):
+    """
+    Remove the start of `text` that repeats the end of `previous`, as left behind by
+    the splitter's CHUNK_OVERLAP.
+    """
+    longest = min(len(previous), len(text), 2 * max_overlap)
+    for size in range(longest, _MIN_OVERLAP - 1, -1):
+        if previous.endswith(text[:size]):
+            return text[size:].lstrip()
+    return text
+
+
+def _dedupe(text, selected):
+    """
+    Trim the parts of `text` already covered by selected chunks. Returns "" if nothing new is left.
+    """
+    for other in selected:
+        if text in other:
+            return ""
+        text = strip_overlap(other, text)
+        # `text` may also precede `other` in the document
+        for size in range(min(len(other), len(text), 2 * CHUNK_OVERLAP), _MIN_OVERLAP - 1, -1):
+            if text.endswith(other[:size]):
+                text = text[:-size].rstrip()
+                break
+    return text
+
+
+def pack_context(chunks, model, max_tokens, separator="\n"):
+    """
+    Greedily fill a context of at most `max_tokens` tokens with `chunks` (best first),
+    dropping duplicate text and chunk overlaps. Returns (context, stats).
+    """
+    selected = []
+    used = 0
+    dropped = 0
+    separator_tokens = count_tokens(separator, model)
+    for chunk in chunks:
+        text = _dedupe(chunk.strip(), selected)
+        if not text:
+            dropped += 1
+            continue
+        tokens = count_tokens(text, model) + (separator_tokens if selected else 0)
+        if used + tokens > max_tokens:
+            # A smaller, less relevant chunk may still fit
+            dropped += 1
+            continue
+        selected.append(text)
+        used += tokens
+
+    stats = {"context_tokens": used, "chunks_used": len(selected), "chunks_dropped": dropped}
+    return separator.join(selected), stats
+
+
+def log_prompt_tokens(prompt, model, label="prompt"):
+    """
+    Log and return the token count of a prompt about to be sent to `model`.
+    """
+    tokens = count_tokens(prompt, model)
+    logging.info(f"{label} for {model}: {tokens} tokens (window {context_window(model)}).")
+    return tokens
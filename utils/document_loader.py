@@ -1,37 +1,218 @@
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import docx
-import fitz  # PyMuPDF
-import requests
-from bs4 import BeautifulSoup
-from config.config import CHUNK_SIZE, CHUNK_OVERLAP
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.config import (
+    CHUNK_SIZE, CHUNK_OVERLAP, PDF_PARALLEL_MIN_PAGES, PDF_EXTRACT_WORKERS, PDF_PAGES_PER_TASK,
+)
+
+# WordprocessingML run children that iter_docx_pages reads
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_DOCX_RUN, _DOCX_TEXT, _DOCX_TAB, _DOCX_BREAK, _DOCX_CR = (_W + tag for tag in ("r", "t", "tab", "br", "cr"))
+# Where Word's last layout put a page boundary; also written right after explicit breaks
+_DOCX_RENDERED_BREAK = _W + "lastRenderedPageBreak"
+
+
+def _read_pdf_bytes(file):
+    return file.getvalue() if hasattr(file, "getvalue") else file.read()
+
+
+def _extract_page_range(path, start, stop):
+    """
+    Worker: extract the text of pages [start, stop) from a PDF on disk.
+    """
+    import fitz  # PyMuPDF
+
+    doc = fitz.open(path)
+    try:
+        return [doc[i].get_text() for i in range(start, stop)]
+    finally:
+        doc.close()
+
+
+# Long-lived extraction pools keyed by size, shared by every caller in the process:
+# concurrent uploads or batch workers queue on the same processes instead of each
+# starting cpu_count of their own
+_PDF_POOLS = {}
+_PDF_POOLS_LOCK = threading.Lock()
+
+
+def _pdf_pool(workers):
+    with _PDF_POOLS_LOCK:
+        pool = _PDF_POOLS.get(workers)
+        if pool is None:
+            # Workers start from a small forkserver (spawn where it's unavailable) rather
+            # than forking the app with its loaded models and threads
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            pool = _PDF_POOLS[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        return pool
+
+
+def _drop_pdf_pool(workers, pool):
+    with _PDF_POOLS_LOCK:
+        if _PDF_POOLS.get(workers) is pool:
+            del _PDF_POOLS[workers]
+    pool.shutdown(wait=False)
+
+
+def _iter_pdf_pages_parallel(data, page_count, workers):
+    """
+    Extract page ranges in worker processes and yield pages back in document order.
+    Each worker opens its own handle on a temp copy of the PDF.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+        tmp.write(data)
+        path = tmp.name
+    try:
+        ranges = [
+            (start, min(start + PDF_PAGES_PER_TASK, page_count))
+            for start in range(0, page_count, PDF_PAGES_PER_TASK)
+        ]
+        pending = deque()
+        pool = _pdf_pool(workers)
+        try:
+            for start, stop in ranges:
+                pending.append((start, pool.submit(_extract_page_range, path, start, stop)))
+                # Keep a bounded window of ranges in flight so memory stays flat
+                if len(pending) >= 2 * workers:
+                    first, future = pending.popleft()
+                    for offset, text in enumerate(future.result()):
+                        yield first + offset + 1, text
+            while pending:
+                first, future = pending.popleft()
+                for offset, text in enumerate(future.result()):
+                    yield first + offset + 1, text
+        except BrokenProcessPool:
+            # A worker died; the next document gets a fresh pool
+            _drop_pdf_pool(workers, pool)
+            raise
+        finally:
+            # Don't leave this document's ranges queued ahead of other callers
+            for _, future in pending:
+                future.cancel()
+    finally:
+        os.unlink(path)
+
+
+def iter_pdf_pages(file, parallel=None, workers=PDF_EXTRACT_WORKERS):
+    """
+    Yield (page_number, text) for each page of an uploaded PDF, one page at a time.
+    Large PDFs (at least PDF_PARALLEL_MIN_PAGES pages) are extracted across a shared
+    process pool of `workers` processes unless `parallel` says otherwise.
+    """
+    import fitz  # PyMuPDF
+
+    data = _read_pdf_bytes(file)
+    doc = fitz.open(stream=data, filetype="pdf")
+    if parallel is None:
+        parallel = workers > 1 and doc.page_count >= PDF_PARALLEL_MIN_PAGES
+
+    if parallel:
+        page_count = doc.page_count
+        doc.close()
+        yield from _iter_pdf_pages_parallel(data, page_count, workers)
+        return
+
+    try:
+        for page in doc:
+            yield page.number + 1, page.get_text()
+    finally:
+        doc.close()
+
+
+def iter_docx_pages(file):
+    """
+    Yield (page_number, text) for an uploaded DOCX, splitting on the page breaks
+    Word recorded in the file. Documents without breaks come out as one page.
+    """
+    import docx
+
+    doc = docx.Document(file)
+    page_number = 1
+    lines = []
+    # True from an explicit page break until the next text: the rendered break Word
+    # writes at the top of that new page marks the same boundary
+    after_break = False
+    for paragraph in doc.paragraphs:
+        parts = []
+        split = False
+        for run in paragraph._p.iter(_DOCX_RUN):
+            for child in run:
+                explicit = child.tag == _DOCX_BREAK and child.get(_W + "type") == "page"
+                rendered = child.tag == _DOCX_RENDERED_BREAK and not after_break
+                if explicit or rendered:
+                    # Text before the break stays on this page, the rest opens the next one
+                    if lines or parts:
+                        if parts:
+                            lines.append("".join(parts))
+                        yield page_number, "\n".join(lines)
+                        page_number += 1
+                        lines, parts, split = [], [], True
+                    after_break = explicit
+                elif child.tag == _DOCX_TEXT and child.text:
+                    parts.append(child.text)
+                    after_break = False
+                elif child.tag == _DOCX_TAB:
+                    parts.append("\t")
+                elif child.tag in (_DOCX_BREAK, _DOCX_CR):
+                    parts.append("\n")
+        # A paragraph that ended with its page break leaves nothing for the next page
+        if parts or not split:
+            lines.append("".join(parts))
+    if lines:
+        yield page_number, "\n".join(lines)
+
+
+def iter_text_pages(text):
+    """
+    Treat already-extracted text as a single page.
+    """
+    yield 1, text
+
 
 def extract_text_from_pdf(file):
     """
     Extract text from uploaded PDF.
     """
-    doc = fitz.open(stream=file.read(), filetype="pdf")
-    return "\n".join([page.get_text() for page in doc])
+    return "\n".join(text for _, text in iter_pdf_pages(file))
 
 def extract_text_from_docx(file):
     """
     Extract text from uploaded DOCX.
     """
-    doc = docx.Document(file)
-    return "\n".join([p.text for p in doc.paragraphs])
+    return "\n".join(text for _, text in iter_docx_pages(file))
 
 def extract_text_from_url(url):
     """
     Extract raw text from a web page.
     """
-    html = requests.get(url).text
-    soup = BeautifulSoup(html, "html.parser")
-    return soup.get_text(separator="\n")
+    from utils.fetch import fetch_text
+
+    return fetch_text(url)
+
+def _splitter():
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
 
 def split_text(text):
     """
     Split text into overlapping chunks for embedding.
     """
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
-    )
-    return splitter.split_text(text)
+    return _splitter().split_text(text)
+
+def iter_chunks(pages):
+    """
+    Split a stream of (page_number, text) pages into (chunk, metadata) pairs,
+    keeping the page number on every chunk.
+    """
+    splitter = _splitter()
+    for page_number, text in pages:
+        for chunk in splitter.split_text(text):
+            yield chunk, {"page": page_number}
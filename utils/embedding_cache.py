@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+from config.config import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+from utils import telemetry
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH = 500
+# A hit refreshes a row's last_used at most this often, so lookups rarely write
+_TOUCH_INTERVAL = 3600
+# Trim once the cache is this much over its cap, rather than on every insert
+_TRIM_SLACK = 1.1
+
+_LOCAL = threading.local()
+_ROWS_LOCK = threading.Lock()
+_ROWS = None  # approximate row count, read from the database on first insert
+
+
+def _connect():
+    """
+    Return this thread's connection to the cache database, creating it if needed.
+    """
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        directory = os.path.dirname(EMBEDDING_CACHE_PATH)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " chunk_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used INTEGER NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (model, chunk_hash))"
+        )
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(embeddings)")]
+        if "last_used" not in columns:
+            # Caches written before the size cap; existing rows count as least recently used
+            conn.execute("ALTER TABLE embeddings ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        conn.commit()
+        _LOCAL.conn = conn
+    return conn
+
+
+def chunk_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def get_vectors(model_name, hashes):
+    """
+    Look up cached vectors. Returns a dict of chunk hash -> float32 array for the hits.
+    """
+    conn = _connect()
+    now = int(time.time())
+    found = {}
+    stale = []
+    unique = list(dict.fromkeys(hashes))
+    for start in range(0, len(unique), _QUERY_BATCH):
+        batch = unique[start:start + _QUERY_BATCH]
+        placeholders = ",".join("?" * len(batch))
+        rows = conn.execute(
+            "SELECT chunk_hash, vector, last_used FROM embeddings"
+            f" WHERE model = ? AND chunk_hash IN ({placeholders})",
+            [model_name, *batch],
+        )
+        for h, blob, last_used in rows:
+            found[h] = np.frombuffer(blob, dtype=np.float32)
+            if now - last_used > _TOUCH_INTERVAL:
+                stale.append(h)
+    if stale:
+        with conn:
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND chunk_hash = ?",
+                [(now, model_name, h) for h in stale],
+            )
+    return found
+
+
+def put_vectors(model_name, hashes, vectors):
+    """
+    Store vectors for the given chunk hashes.
+    """
+    global _ROWS
+    conn = _connect()
+    now = int(time.time())
+    rows = [
+        (model_name, h, np.asarray(v, dtype=np.float32).tobytes(), now)
+        for h, v in zip(hashes, vectors)
+    ]
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, chunk_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+    with _ROWS_LOCK:
+        if _ROWS is None:
+            _ROWS = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        else:
+            _ROWS += len(rows)
+        if _ROWS > EMBEDDING_CACHE_MAX_ENTRIES * _TRIM_SLACK:
+            _ROWS = trim(EMBEDDING_CACHE_MAX_ENTRIES)
+
+
+def trim(max_entries=EMBEDDING_CACHE_MAX_ENTRIES):
+    """
+    Delete the least recently used vectors until at most `max_entries` remain.
+    Returns the number of rows left. Freed pages are reused by later inserts.
+    """
+    conn = _connect()
+    with conn:
+        total = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = total - max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN"
+                " (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logging.info(f"Embedding cache trimmed {excess} least recently used vectors.")
+    return min(total, max_entries)
+
+
+def embed_with_cache(texts, embeddings, model_name, parent=None):
+    """
+    Embed texts, sending only cache misses to the model.
+    Returns one float32 vector per input text, in order. `parent` is the span of the
+    ingestion this batch belongs to (batches run on worker threads).
+    """
+    with telemetry.span("embed_batch", parent=parent, chunks=len(texts)) as span:
+        hashes = [chunk_hash(t) for t in texts]
+        cached = get_vectors(model_name, hashes)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+
+        if missing:
+            new_vectors = embeddings.embed_documents(list(missing.values()))
+            put_vectors(model_name, list(missing), new_vectors)
+            for h, v in zip(missing, new_vectors):
+                cached[h] = np.asarray(v, dtype=np.float32)
+
+        span.set(cache_hits=len(texts) - len(missing), cache_misses=len(missing))
+        logging.info(f"Embedding cache: {len(texts) - len(missing)} hits, {len(missing)} misses.")
+        return [cached[h] for h in hashes]
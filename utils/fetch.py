@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import uuid
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from config.config import (
+    URL_CONNECT_TIMEOUT, URL_READ_TIMEOUT, URL_MAX_BYTES, URL_CACHE_DIR, URL_POOL_SIZE,
+)
+
+try:
+    import lxml  # noqa: F401  (optional, much faster than html.parser)
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+_SESSION = None
+
+
+def _session():
+    """
+    Shared session so repeated fetches reuse pooled keep-alive connections.
+    """
+    global _SESSION
+    if _SESSION is None:
+        session = requests.Session()
+        retry = Retry(
+            total=2, backoff_factor=0.5, status_forcelist=[502, 503, 504], allowed_methods=["GET"]
+        )
+        adapter = HTTPAdapter(pool_connections=URL_POOL_SIZE, pool_maxsize=URL_POOL_SIZE, max_retries=retry)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers["User-Agent"] = "ClauseMate/1.0 (+https://github.com/nikhiljose7/ClauseMate)"
+        _SESSION = session
+    return _SESSION
+
+
+def _cache_file(url):
+    return os.path.join(URL_CACHE_DIR, hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def _load_entry(url):
+    try:
+        with open(_cache_file(url), encoding="utf-8") as f:
+            entry = json.load(f)
+        return entry if entry.get("url") == url else None
+    except (OSError, ValueError):
+        return None
+
+
+def _save_entry(url, entry):
+    os.makedirs(URL_CACHE_DIR, exist_ok=True)
+    path = _cache_file(url)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"url": url, **entry}, f)
+    os.replace(tmp_path, path)
+
+
+def _read_body(response):
+    """
+    Read a streamed response body, refusing anything larger than URL_MAX_BYTES.
+    """
+    declared = response.headers.get("Content-Length")
+    if declared and declared.isdigit() and int(declared) > URL_MAX_BYTES:
+        raise ValueError(f"Page is too large ({int(declared)} bytes; limit is {URL_MAX_BYTES}).")
+    body = bytearray()
+    for block in response.iter_content(chunk_size=64 * 1024):
+        body.extend(block)
+        if len(body) > URL_MAX_BYTES:
+            raise ValueError(f"Page is too large (over {URL_MAX_BYTES} bytes).")
+    return bytes(body)
+
+
+def html_to_text(html):
+    soup = BeautifulSoup(html, HTML_PARSER)
+    return soup.get_text(separator="\n")
+
+
+def fetch_text(url):
+    """
+    Fetch a web page and return its text. Pages are cached on disk with their ETag /
+    Last-Modified validators; an unchanged page (304, or an identical body) returns
+    the cached text without parsing it again.
+    """
+    entry = _load_entry(url)
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    with _session().get(
+        url, headers=headers, timeout=(URL_CONNECT_TIMEOUT, URL_READ_TIMEOUT), stream=True
+    ) as response:
+        if response.status_code == 304 and entry:
+            logging.info(f"{url} not modified; using cached text.")
+            return entry["text"]
+        response.raise_for_status()
+        body = _read_body(response)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    body_hash = hashlib.sha256(body).hexdigest()
+    if entry and entry.get("body_sha256") == body_hash:
+        logging.info(f"{url} body unchanged; using cached text.")
+        text = entry["text"]
+    else:
+        text = html_to_text(body)
+
+    _save_entry(url, {
+        "etag": etag, "last_modified": last_modified, "body_sha256": body_hash, "text": text,
+    })
+    return text
@@ -0,0 +1,63 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from config.config import EMBEDDING_BATCH_SIZE, EMBEDDING_WORKERS
+from utils import telemetry
+from utils.embedding_cache import embed_with_cache
+
+_STATS_LOCK = threading.Lock()
+_STATS = {"chunks": 0, "seconds": 0.0, "last_chunks_per_second": 0.0}
+
+
+def _batched(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def iter_embedded_batches(chunks, embeddings, model_name,
+                          batch_size=EMBEDDING_BATCH_SIZE, workers=EMBEDDING_WORKERS):
+    """
+    Embed (text, metadata) chunks in batches across a pool of worker threads.
+    Yields (batch, vectors) in input order. `chunks` may be any iterable, including
+    a lazy stream; at most two batches per worker are in flight at once.
+    """
+    pending = deque()
+    parent = telemetry.current_span()
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="embed") as pool:
+        for batch in _batched(chunks, batch_size):
+            texts = [text for text, _ in batch]
+            pending.append((batch, pool.submit(embed_with_cache, texts, embeddings, model_name, parent)))
+            if len(pending) >= 2 * workers:
+                batch, future = pending.popleft()
+                yield batch, future.result()
+        while pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+
+
+def record_throughput(chunks, seconds):
+    """
+    Record one ingestion run and return its throughput in chunks per second.
+    """
+    rate = chunks / seconds if seconds > 0 else 0.0
+    with _STATS_LOCK:
+        _STATS["chunks"] += chunks
+        _STATS["seconds"] += seconds
+        _STATS["last_chunks_per_second"] = rate
+    logging.info(f"Embedded {chunks} chunks in {seconds:.2f}s ({rate:.1f} chunks/s).")
+    return rate
+
+
+def get_ingestion_stats():
+    """
+    Return cumulative chunk count, embedding time and throughput figures.
+    """
+    with _STATS_LOCK:
+        stats = dict(_STATS)
+    stats["avg_chunks_per_second"] = stats["chunks"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
@@ -0,0 +1,33 @@
+import importlib
+import threading
+
+_LOCK = threading.Lock()
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access, so heavy
+    dependencies are only loaded by the code paths that use them.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            with _LOCK:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name):
+    return LazyModule(name)
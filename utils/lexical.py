@@ -0,0 +1,96 @@
+import re
+from collections import Counter
+
+import numpy as np
+from config.config import BM25_K1, BM25_B
+
+# Words, plus dotted section numbers such as "12.3" kept as one token
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+
+LEXICAL_FILE = "lexical.npz"
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over a document's chunks, stored as CSR-style NumPy arrays:
+    the postings of term t are doc_ids/tfs[indptr[t]:indptr[t + 1]].
+    """
+
+    def __init__(self, vocab, indptr, doc_ids, tfs, doc_len):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.avg_len = float(doc_len.mean()) if self.n_docs else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        postings = {}
+        doc_len = np.zeros(len(texts), dtype=np.float32)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            doc_len[doc] = sum(counts.values())
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_ids, tfs = [], []
+        for t, term in enumerate(terms):
+            entries = postings[term]
+            indptr[t + 1] = indptr[t] + len(entries)
+            doc_ids.extend(doc for doc, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+        return cls(
+            {term: t for t, term in enumerate(terms)},
+            indptr,
+            np.asarray(doc_ids, dtype=np.int32),
+            np.asarray(tfs, dtype=np.float32),
+            doc_len,
+        )
+
+    def scores(self, query):
+        """
+        BM25 score of every chunk for the query, as a float32 array.
+        """
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        if not self.n_docs:
+            return scores
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / self.avg_len)
+        for term in set(tokenize(query)):
+            t = self.vocab.get(term)
+            if t is None:
+                continue
+            start, stop = self.indptr[t], self.indptr[t + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.tfs[start:stop]
+            df = stop - start
+            idf = np.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+            # Each term appears at most once per chunk in the postings, so plain indexing is safe
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        return scores
+
+    def save(self, path):
+        terms = np.array(sorted(self.vocab, key=self.vocab.get))
+        np.savez(
+            path, terms=terms, indptr=self.indptr, doc_ids=self.doc_ids,
+            tfs=self.tfs, doc_len=self.doc_len,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            vocab = {term: t for t, term in enumerate(data["terms"].tolist())}
+            return cls(vocab, data["indptr"], data["doc_ids"], data["tfs"], data["doc_len"])
+
+    def nbytes(self):
+        return (
+            self.indptr.nbytes + self.doc_ids.nbytes + self.tfs.nbytes + self.doc_len.nbytes
+            + sum(len(term) + 64 for term in self.vocab)
+        )
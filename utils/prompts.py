@@ -1,4 +1,4 @@
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 QA_PROMPT = PromptTemplate(
     input_variables=["context", "question", "detail_level"],
@@ -91,3 +91,60 @@ SUMMARY_PROMPT = PromptTemplate(
         "Use plain language and keep it user-friendly. Do not use legal jargon."
     )
 )
+
+# Marker separating the summary from the risk list in SUMMARY_WITH_RISKS_PROMPT replies
+RISKS_MARKER = "RISKY CLAUSES:"
+
+SUMMARY_WITH_RISKS_PROMPT = PromptTemplate(
+    input_variables=["context", "question", "detail_level"],
+    template=SUMMARY_PROMPT.template + (
+        "\n\nAfter the summary, write a line containing only '" + RISKS_MARKER + "'. Below it, list any clauses "
+        "that could be risky or surprising for the user, such as data sharing, automatic renewals, hidden fees, "
+        "liability waivers, arbitration, or account termination rights. "
+        "Write one short bullet point per clause, starting with '- '. If there are none, write: NONE"
+    )
+)
+
+SECTION_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["context"],
+    template=(
+        "You are summarizing one section of a longer Terms & Conditions, Privacy Policy, or similar legal document.\n\n"
+
+        "--- Section Text ---\n"
+        "{context}\n"
+        "--- End of Section Text ---\n\n"
+
+        "Write a short plain-language summary of this section. Mention the key rules, user responsibilities, "
+        "rights, fees, and data practices it covers. Do not add anything that is not in the text."
+    )
+)
+
+COMPANY_NAME_PROMPT = PromptTemplate(
+    input_variables=["context"],
+    template=(
+        "Below is the beginning of a legal document.\n\n"
+
+        "--- Document Text ---\n"
+        "{context}\n"
+        "--- End of Document Text ---\n\n"
+
+        "Reply with only the name of the company, service, or product this document belongs to. "
+        "If no name is mentioned, reply with: UNKNOWN"
+    )
+)
+
+RISK_PROMPT = PromptTemplate(
+    input_variables=["context"],
+    template=(
+        "You are reviewing part of a Terms & Conditions, Privacy Policy, or similar legal document for a user.\n\n"
+
+        "--- Document Text ---\n"
+        "{context}\n"
+        "--- End of Document Text ---\n\n"
+
+        "List any clauses that could be risky or surprising for the user, such as data sharing, automatic renewals, "
+        "hidden fees, liability waivers, arbitration, or account termination rights. "
+        "Write one short bullet point per clause, starting with '- '. "
+        "If there are none, reply with: NONE"
+    )
+)
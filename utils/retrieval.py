@@ -0,0 +1,55 @@
+import numpy as np
+from config.config import HYBRID_DENSE_WEIGHT, RRF_K, RETRIEVAL_MMR_LAMBDA
+
+
+def top_k(scores, k):
+    """
+    Indices of the k highest scores, best first.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+def fuse(dense_ids, lexical_ids, n_docs, dense_weight=HYBRID_DENSE_WEIGHT):
+    """
+    Weighted reciprocal rank fusion of two ranked candidate lists.
+    Returns (candidate ids, fused scores), best first.
+    """
+    scores = np.zeros(n_docs, dtype=np.float32)
+    dense_ids = np.asarray(dense_ids, dtype=np.int64)
+    lexical_ids = np.asarray(lexical_ids, dtype=np.int64)
+    scores[dense_ids] += dense_weight / (RRF_K + 1 + np.arange(len(dense_ids)))
+    scores[lexical_ids] += (1 - dense_weight) / (RRF_K + 1 + np.arange(len(lexical_ids)))
+
+    candidates = np.union1d(dense_ids, lexical_ids)
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order], scores[candidates][order]
+
+
+def mmr(vectors, relevance, k, lambda_mult=RETRIEVAL_MMR_LAMBDA):
+    """
+    Maximal marginal relevance: pick k of the candidate `vectors` trading off
+    `relevance` against similarity to what is already selected.
+    Returns positions into `vectors`.
+    """
+    if len(vectors) == 0:
+        return []
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    unit = vectors / np.where(norms == 0, 1, norms)
+    pairwise = unit @ unit.T
+    # Put relevance on the same 0..1 scale as cosine similarity
+    span = relevance.max() - relevance.min()
+    rel = (relevance - relevance.min()) / span if span > 0 else np.ones_like(relevance)
+
+    selected = [int(np.argmax(rel))]
+    redundancy = pairwise[selected[0]].copy()
+    while len(selected) < min(k, len(vectors)):
+        score = lambda_mult * rel - (1 - lambda_mult) * redundancy
+        score[selected] = -np.inf
+        best = int(np.argmax(score))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return selected
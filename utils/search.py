@@ -1,27 +1,151 @@
-from tavily import TavilyClient
-from config.config import TAVILY_API_KEY
+from concurrent.futures import ThreadPoolExecutor
 import logging
+import re
+import threading
+
+from config import config
+from config.config import (
+    TAVILY_BASE_URL, SEARCH_CACHE_TTL, SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_MAX_RESULTS, SEARCH_RESULTS_PER_QUERY, SEARCH_QUERY_VARIANTS, SEARCH_WORKERS,
+)
+from utils import telemetry
+from utils.cache import LRUCache
+
+# Words dropped when building cache keys, so trivially different phrasings share an entry
+_STOP_WORDS = {"a", "an", "the", "is", "are", "what", "whats", "does", "do", "please", "can", "you", "me", "tell"}
+
+# Normalized query -> list of result dicts
+_CACHE = LRUCache(max_entries=SEARCH_CACHE_MAX_ENTRIES, ttl=SEARCH_CACHE_TTL)
+_POOL = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+_BACKEND = None
+
+
+def _client():
+    global _CLIENT
+    if _CLIENT is None:
+        with _CLIENT_LOCK:
+            if _CLIENT is None:
+                from tavily import TavilyClient
+
+                kwargs = {"api_base_url": TAVILY_BASE_URL} if TAVILY_BASE_URL else {}
+                _CLIENT = TavilyClient(api_key=config.TAVILY_API_KEY, **kwargs)
+    return _CLIENT
+
+
+def _tavily_search(query, max_results):
+    # The search method returns a dictionary, and the actual results
+    # are in a list under the 'results' key.
+    response = _client().search(query, max_results=max_results)
+    return response.get('results', [])
+
+
+def set_search_backend(backend):
+    """
+    Replace the Tavily backend with `backend(query, max_results) -> list of result
+    dicts` (e.g. a local fake for tests and benchmarks). Pass None to restore Tavily.
+    Clears the result cache.
+    """
+    global _BACKEND
+    _BACKEND = backend
+    _CACHE.clear()
+
+
+def normalize_query(query):
+    """
+    Cache key for a query: lowercase words without punctuation or filler words.
+    """
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(w for w in words if w not in _STOP_WORDS) or " ".join(words)
+
+
+def reformulate(query, variants=SEARCH_QUERY_VARIANTS):
+    """
+    The original query plus legal-context rewrites, searched together for broader coverage.
+    """
+    queries = [
+        query,
+        f"{query} legal meaning",
+        f"{query} terms and conditions clause example",
+    ]
+    return queries[:max(1, variants)]
+
+
+def _search_one(query, max_results, parent=None):
+    with telemetry.span("web_search.query", parent=parent) as span:
+        key = normalize_query(query)
+        results = _CACHE.get(key)
+        span.set(cache="miss" if results is None else "hit")
+        if results is None:
+            backend = _BACKEND or _tavily_search
+            results = backend(query, max_results)
+            _CACHE.put(key, results)
+        span.set(results=len(results))
+        return results
+
+
+def _merge(result_lists, limit):
+    """
+    Interleave ranked result lists, dropping duplicate URLs and contents.
+    """
+    merged, seen = [], set()
+    for rank in range(max((len(results) for results in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            key = result.get('url') or result.get('content', '')
+            if key in seen or not result.get('content'):
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged[:limit]
+
+
+def search_results(query, max_results=SEARCH_MAX_RESULTS):
+    """
+    Run the query and its reformulations concurrently and return merged, deduplicated results.
+    """
+    queries = reformulate(query)
+    parent = telemetry.current_span()
+    futures = [_POOL.submit(_search_one, q, SEARCH_RESULTS_PER_QUERY, parent) for q in queries]
+    result_lists = []
+    for q, future in zip(queries, futures):
+        try:
+            result_lists.append(future.result())
+        except Exception as e:
+            logging.warning(f"Search for '{q}' failed: {e}")
+    if not result_lists:
+        raise RuntimeError("All web searches failed.")
+    return _merge(result_lists, max_results)
+
 
 def live_web_search(query):
     """
     Perform a live web search using Tavily API.
     """
-    try:
-        client = TavilyClient(api_key=TAVILY_API_KEY)
-        # The search method returns a dictionary, and the actual results
-        # are in a list under the 'results' key.
-        response = client.search(query, max_results=3)
-        
-        # Safely get the list of results from the response dictionary
-        results_list = response.get('results', [])
-        
-        if not results_list:
-            logging.warning("Tavily search returned no results.")
-            return "No information could be found from a web search."
-            
-        # Safely get the 'content' from each result dictionary
-        return "\n".join([r.get('content', '') for r in results_list])
-
-    except Exception as e:
-        logging.error(f"Tavily search failed: {e}", exc_info=True)
-        return "Sorry, the live web search failed. Please check the API key and service status."
+    with telemetry.span("live_web_search") as span:
+        try:
+            results_list = search_results(query)
+
+            if not results_list:
+                logging.warning("Tavily search returned no results.")
+                return "No information could be found from a web search."
+
+            # Safely get the 'content' from each result dictionary
+            context = "\n".join([r.get('content', '') for r in results_list])
+            span.set(results=len(results_list), bytes=len(context.encode("utf-8")))
+            return context
+
+        except Exception as e:
+            logging.error(f"Tavily search failed: {e}", exc_info=True)
+            span.set(failed=True)
+            return "Sorry, the live web search failed. Please check the API key and service status."
+
+
+def get_search_cache_stats():
+    """
+    Return hit/miss counts and hit rate of the search result cache.
+    """
+    return _CACHE.stats()
@@ -0,0 +1,345 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config.config import (
+    TELEMETRY_ENABLED, TELEMETRY_JSON_LOG, TELEMETRY_METRICS_PORT,
+    TELEMETRY_PROFILE_SLOW_SECONDS, TELEMETRY_PROFILE_INTERVAL, TELEMETRY_PROFILE_TOP_STACKS,
+)
+
+# Upper bounds (seconds) of the span duration histogram buckets
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Numeric attributes that are volumes worth totalling; others (e.g. search `k`) are only exported
+_SUMMED_UNITS = ("bytes", "tokens", "chunks")
+
+_LOCAL = threading.local()
+_METRICS_LOCK = threading.Lock()
+# span name -> {"count", "errors", "seconds", "buckets": [...], "values": {attr: sum}, "cache": Counter}
+_METRICS = {}
+_LOG_LOCK = threading.Lock()
+_SERVER = None
+_SERVER_LOCK = threading.Lock()
+
+
+class Span:
+    """
+    One timed stage. Attributes set with `set()` are exported with the span: sizes,
+    token and chunk counts are also summed per span name, and a `cache` attribute
+    ("hit" / "miss") is counted as a cache outcome.
+    """
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = dict(attrs or {})
+        self.start = time.time()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": round(self.start, 6),
+            "duration_ms": round(self.duration * 1000, 3),
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class _NoopSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+def _stack():
+    stack = getattr(_LOCAL, "stack", None)
+    if stack is None:
+        stack = _LOCAL.stack = []
+    return stack
+
+
+def current_span():
+    """
+    The innermost open span on this thread, to pass as `parent` to work on other threads.
+    """
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+@contextmanager
+def span(name, parent=None, profile=False, **attrs):
+    """
+    Time a pipeline stage. Nested spans on the same thread join the enclosing trace;
+    work handed to another thread can join it by passing `parent=current_span()`.
+    With `profile`, the stage is stack-sampled and the hottest stacks are logged if it
+    is slower than TELEMETRY_PROFILE_SLOW_SECONDS.
+    """
+    if not TELEMETRY_ENABLED:
+        yield _NOOP
+        return
+
+    stack = _stack()
+    current = Span(name, parent or (stack[-1] if stack else None), attrs)
+    profiling = profile and TELEMETRY_PROFILE_SLOW_SECONDS > 0
+    if profiling:
+        _PROFILER.begin()
+    stack.append(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        if stack and stack[-1] is current:
+            stack.pop()
+        elif current in stack:
+            stack.remove(current)
+        samples = _PROFILER.end() if profiling else None
+        _finish(current, samples)
+
+
+def record_span(name, seconds, parent=None, error=None, **attrs):
+    """
+    Record an already-timed stage, e.g. a generator that can't hold a span open
+    across its yields.
+    """
+    if not TELEMETRY_ENABLED:
+        return
+    finished = Span(name, parent or current_span(), attrs)
+    finished.start = time.time() - seconds
+    finished.duration = seconds
+    finished.error = error
+    _finish(finished)
+
+
+def _finish(finished, samples=None):
+    _record(finished)
+    record = finished.to_dict()
+    if samples is not None and finished.duration >= TELEMETRY_PROFILE_SLOW_SECONDS:
+        record["profile"] = [
+            {"stack": stack, "samples": count}
+            for stack, count in samples.most_common(TELEMETRY_PROFILE_TOP_STACKS)
+        ]
+        logging.warning(
+            f"Slow {finished.name} ({finished.duration:.2f}s); hottest stacks:\n"
+            + "\n".join(f"{count:>5} {stack}" for stack, count in samples.most_common(3))
+        )
+    if TELEMETRY_JSON_LOG:
+        _write_json(record)
+
+
+def _record(finished):
+    with _METRICS_LOCK:
+        metrics = _METRICS.setdefault(finished.name, {
+            "count": 0, "errors": 0, "seconds": 0.0,
+            "buckets": [0] * len(_BUCKETS), "values": {}, "cache": Counter(),
+        })
+        metrics["count"] += 1
+        metrics["errors"] += 1 if finished.error else 0
+        metrics["seconds"] += finished.duration
+        for i, bound in enumerate(_BUCKETS):
+            if finished.duration <= bound:
+                metrics["buckets"][i] += 1
+        for key, value in finished.attrs.items():
+            if key == "cache":
+                metrics["cache"][value] += 1
+            elif _summed(key, value):
+                metrics["values"][key] = metrics["values"].get(key, 0) + value
+
+
+def _summed(key, value):
+    # "bytes", "prompt_tokens", "chunks", ... but not settings like "k" or flags
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return False
+    return key.rsplit("_", 1)[-1] in _SUMMED_UNITS
+
+
+def _write_json(record):
+    line = json.dumps(record, default=str) + "\n"
+    with _LOG_LOCK:
+        directory = os.path.dirname(TELEMETRY_JSON_LOG)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(TELEMETRY_JSON_LOG, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class _StackSampler:
+    """
+    Samples the stacks of threads inside profiled spans from one background thread,
+    so nothing is paid on the profiled threads themselves.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._lock = threading.Lock()
+        # Signalled when a thread enters a profiled span; the sampler sleeps on it while idle
+        self._wake = threading.Condition(self._lock)
+        self._active = {}  # thread id -> [nesting depth, Counter of folded stacks]
+        self._thread = None
+
+    def begin(self):
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._active.setdefault(ident, [0, Counter()])
+            entry[0] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="telemetry-sampler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+
+    def end(self):
+        ident = threading.get_ident()
+        with self._lock:
+            entry = self._active[ident]
+            entry[0] -= 1
+            if entry[0] == 0:
+                del self._active[ident]
+            return Counter(entry[1])
+
+    def _run(self):
+        while True:
+            with self._wake:
+                while not self._active:
+                    self._wake.wait()
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, (_, stacks) in self._active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        stacks[_fold(frame)] += 1
+
+
+def _fold(frame):
+    """
+    A stack as one "outer;...;inner" line of module:function:line frames.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+_PROFILER = _StackSampler(TELEMETRY_PROFILE_INTERVAL)
+
+
+def get_telemetry_stats():
+    """
+    Per-span counts, errors, total and average seconds, summed byte/token/chunk
+    attributes and cache outcomes.
+    """
+    with _METRICS_LOCK:
+        return {
+            name: {
+                "count": m["count"],
+                "errors": m["errors"],
+                "total_seconds": m["seconds"],
+                "avg_seconds": m["seconds"] / m["count"] if m["count"] else 0.0,
+                "values": dict(m["values"]),
+                "cache": dict(m["cache"]),
+            }
+            for name, m in _METRICS.items()
+        }
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def render_prometheus():
+    """
+    All span metrics in the Prometheus text exposition format.
+    """
+    lines = [
+        "# HELP clausemate_span_duration_seconds Duration of pipeline stages.",
+        "# TYPE clausemate_span_duration_seconds histogram",
+    ]
+    with _METRICS_LOCK:
+        metrics = {
+            name: (m["count"], m["errors"], m["seconds"], list(m["buckets"]), dict(m["values"]), dict(m["cache"]))
+            for name, m in _METRICS.items()
+        }
+    for name, (count, _, seconds, buckets, _, _) in sorted(metrics.items()):
+        stage = _label(name)
+        for bound, observed in zip(_BUCKETS, buckets):
+            lines.append(f'clausemate_span_duration_seconds_bucket{{span="{stage}",le="{bound}"}} {observed}')
+        lines.append(f'clausemate_span_duration_seconds_bucket{{span="{stage}",le="+Inf"}} {count}')
+        lines.append(f'clausemate_span_duration_seconds_sum{{span="{stage}"}} {seconds}')
+        lines.append(f'clausemate_span_duration_seconds_count{{span="{stage}"}} {count}')
+
+    lines += ["# HELP clausemate_span_errors_total Stages that raised.", "# TYPE clausemate_span_errors_total counter"]
+    for name, (_, errors, _, _, _, _) in sorted(metrics.items()):
+        lines.append(f'clausemate_span_errors_total{{span="{_label(name)}"}} {errors}')
+
+    lines += [
+        "# HELP clausemate_span_value_total Summed numeric span attributes (bytes, tokens, chunks).",
+        "# TYPE clausemate_span_value_total counter",
+    ]
+    for name, (_, _, _, _, values, _) in sorted(metrics.items()):
+        for key, value in sorted(values.items()):
+            lines.append(f'clausemate_span_value_total{{span="{_label(name)}",attr="{_label(key)}"}} {value}')
+
+    lines += ["# HELP clausemate_cache_total Cache outcomes per stage.", "# TYPE clausemate_cache_total counter"]
+    for name, (_, _, _, _, _, cache) in sorted(metrics.items()):
+        for outcome, value in sorted(cache.items()):
+            lines.append(f'clausemate_cache_total{{span="{_label(name)}",outcome="{_label(outcome)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port=TELEMETRY_METRICS_PORT):
+    """
+    Serve /metrics on localhost from a background thread. Does nothing when `port` is 0
+    or the server is already running. Returns the server (or None).
+    """
+    global _SERVER
+    if not port or not TELEMETRY_ENABLED:
+        return None
+    with _SERVER_LOCK:
+        if _SERVER is None:
+            try:
+                _SERVER = ThreadingHTTPServer(("127.0.0.1", port), _MetricsHandler)
+            except OSError as e:
+                logging.warning(f"Could not serve metrics on port {port}: {e}")
+                return None
+            threading.Thread(target=_SERVER.serve_forever, name="telemetry-metrics", daemon=True).start()
+            logging.info(f"Serving metrics on http://127.0.0.1:{port}/metrics")
+    return _SERVER
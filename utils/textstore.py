@@ -0,0 +1,84 @@
+import mmap
+import os
+from collections.abc import Mapping
+
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_core.documents import Document
+
+CHUNKS_FILE = "chunks.bin"
+OFFSETS_FILE = "offsets.npy"
+PAGES_FILE = "pages.npy"
+
+
+def write_text_store(folder, documents):
+    """
+    Write chunk texts as one UTF-8 blob plus an int64 offsets array, and each
+    chunk's page number (-1 when unknown) as an int32 array.
+    """
+    offsets = [0]
+    pages = []
+    with open(os.path.join(folder, CHUNKS_FILE), "wb") as f:
+        for doc in documents:
+            data = doc.page_content.encode("utf-8")
+            f.write(data)
+            offsets.append(offsets[-1] + len(data))
+            pages.append(doc.metadata.get("page", -1))
+    np.save(os.path.join(folder, OFFSETS_FILE), np.asarray(offsets, dtype=np.int64))
+    np.save(os.path.join(folder, PAGES_FILE), np.asarray(pages, dtype=np.int32))
+
+
+class PositionIds(Mapping):
+    """
+    Stand-in for LangChain's index_to_docstore_id dict: position i maps to id "i",
+    without materialising a dict entry per chunk.
+    """
+
+    def __init__(self, size):
+        self._size = size
+
+    def __getitem__(self, position):
+        if not 0 <= position < self._size:
+            raise KeyError(position)
+        return str(position)
+
+    def __iter__(self):
+        return iter(range(self._size))
+
+    def __len__(self):
+        return self._size
+
+
+class MmapDocstore(Docstore):
+    """
+    Read-only docstore over a text store written by write_text_store. The blob and
+    arrays are memory-mapped, so processes serving the same index share pages and
+    nothing is deserialized up front.
+    """
+
+    def __init__(self, folder):
+        self._offsets = np.load(os.path.join(folder, OFFSETS_FILE), mmap_mode="r")
+        self._pages = np.load(os.path.join(folder, PAGES_FILE), mmap_mode="r")
+        self._file = open(os.path.join(folder, CHUNKS_FILE), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._blob = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def search(self, search):
+        try:
+            i = int(search)
+        except ValueError:
+            return f"ID {search} not found."
+        if not 0 <= i < len(self):
+            return f"ID {search} not found."
+        text = self._blob[int(self._offsets[i]):int(self._offsets[i + 1])].decode("utf-8")
+        page = int(self._pages[i])
+        return Document(page_content=text, metadata={"page": page} if page >= 0 else {})
+
+    def add(self, texts):
+        raise NotImplementedError("MmapDocstore is read-only")
+
+    def delete(self, ids):
+        raise NotImplementedError("MmapDocstore is read-only")
@@ -1,28 +1,546 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import unicodedata
+import uuid
+
+import faiss
+import numpy as np
 from langchain_community.vectorstores import FAISS
 from models.embeddings import get_embeddings_model
-import os
-from config.config import VECTOR_DB_PATH
+from config.config import (
+    VECTOR_DB_ROOT, VECTOR_DB_MAX_BYTES, EMBEDDING_MODEL_NAME, CHUNK_SIZE, CHUNK_OVERLAP,
+    INDEX_CACHE_MAX_ENTRIES, INDEX_CACHE_MAX_BYTES, STREAM_PREVIEW_CHARS,
+    RETRIEVAL_K, RETRIEVAL_CANDIDATES, RETRIEVAL_MMR,
+)
+from utils import ann, telemetry
+from utils.cache import LRUCache
+from utils.document_loader import iter_chunks
+from utils.ingestion import iter_embedded_batches, record_throughput
+from utils.lexical import LexicalIndex, LEXICAL_FILE
+from utils.retrieval import top_k, fuse, mmr
+from utils.textstore import MmapDocstore, PositionIds, write_text_store, OFFSETS_FILE
+
+FAISS_FILE = "index.faiss"
+# Raw upload hash -> document id and preview, so a re-upload skips extraction entirely
+UPLOADS_DIR = os.path.join(VECTOR_DB_ROOT, "uploads")
+# Map vector storage straight from the file where FAISS supports it, so worker
+# processes share one copy in the page cache. IVF inverted lists are mapped with
+# IO_FLAG_MMAP; flat code storage (flat and HNSW indexes) with IO_FLAG_MMAP_IFC.
+# The two can't be combined: IVF reads fail when both are set.
+_MMAP_IFC = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+_IVF_MMAP_FLAGS = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+_FLAT_MMAP_FLAGS = (_MMAP_IFC or faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def _ivf(index):
+    try:
+        return faiss.extract_index_ivf(index)
+    except RuntimeError:
+        return None
+
+
+def _vectors_mapped(index):
+    """
+    Whether the index's vectors are backed by the mapped file rather than owned memory.
+    """
+    ivf = _ivf(index)
+    if ivf is not None:
+        return isinstance(faiss.downcast_InvertedLists(ivf.invlists), faiss.OnDiskInvertedLists)
+    storage = faiss.downcast_index(index.storage) if hasattr(index, "storage") else index
+    codes = getattr(storage, "codes", None)
+    return codes is not None and not getattr(codes, "is_owned", True)
+
+
+def _read_index(index_file):
+    """
+    Read a saved FAISS index, memory-mapping its vectors where this FAISS build can.
+    Returns (index, vectors_mapped).
+    """
+    with open(index_file, "rb") as f:
+        # The fourcc of every IVF index type starts with "Iw"
+        flags = _IVF_MMAP_FLAGS if f.read(2) == b"Iw" else _FLAT_MMAP_FLAGS
+    try:
+        index = faiss.read_index(index_file, flags)
+    except RuntimeError:
+        # Index types this FAISS build cannot map are read normally
+        index = faiss.read_index(index_file)
+    return index, _vectors_mapped(index)
+
+
+def _index_nbytes(vectordb):
+    """
+    Rough resident size of a loaded FAISS store. Vectors and chunk texts mapped from
+    a saved index live in the shared page cache and aren't counted; IVF centroids and
+    HNSW graph links are always read into memory.
+    """
+    index = vectordb.index
+    size = 0 if getattr(vectordb, "vectors_mapped", False) else index.ntotal * index.d * 4
+    ivf = _ivf(index)
+    if ivf is not None:
+        size += ivf.nlist * index.d * 4
+    if hasattr(index, "hnsw"):
+        size += index.hnsw.neighbors.size() * 4
+    docs = getattr(vectordb.docstore, "_dict", {})
+    size += sum(len(doc.page_content.encode("utf-8")) for doc in docs.values())
+    return size
+
+
+# Loaded indexes kept in memory, keyed by document id
+_INDEX_CACHE = LRUCache(
+    max_entries=INDEX_CACHE_MAX_ENTRIES,
+    max_bytes=INDEX_CACHE_MAX_BYTES,
+    sizeof=_index_nbytes,
+)
+
+# BM25 indexes, keyed by (document id, chunk count) so one never outlives the index it was built for
+_LEXICAL_CACHE = LRUCache(
+    max_entries=INDEX_CACHE_MAX_ENTRIES,
+    max_bytes=INDEX_CACHE_MAX_BYTES // 4,
+    sizeof=lambda lexical: lexical.nbytes(),
+)
+
+
+def normalize_text(text):
+    """
+    Canonical form of a document used for content addressing.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def document_id(text):
+    """
+    Content address of a document: a hash of its normalized text together with
+    the embedding model and chunking parameters the index is built with.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{EMBEDDING_MODEL_NAME}|{CHUNK_SIZE}|{CHUNK_OVERLAP}\n".encode("utf-8"))
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def index_path(doc_id):
+    """
+    Directory holding the saved index for a document.
+    """
+    return os.path.join(VECTOR_DB_ROOT, doc_id)
+
+
+def _is_saved(path):
+    # Directories from the old pickle-based layout lack the text store and are rebuilt
+    return os.path.exists(os.path.join(path, OFFSETS_FILE))
+
+
+def vectorstore_exists(doc_id):
+    """
+    Whether an index for this document is already available.
+    """
+    return doc_id in _INDEX_CACHE or _is_saved(index_path(doc_id))
+
+
+def _touch(path):
+    # Directory mtime doubles as the last-used time for garbage collection
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+class _PageStream:
+    """
+    Pass-through over (page_number, text) pages that computes the document id
+    incrementally and keeps a bounded preview of the leading text.
+    """
+
+    def __init__(self, pages, preview_chars):
+        self._pages = pages
+        self._preview_chars = preview_chars
+        self._digest = hashlib.sha256()
+        self._digest.update(f"{EMBEDDING_MODEL_NAME}|{CHUNK_SIZE}|{CHUNK_OVERLAP}\n".encode("utf-8"))
+        self._started = False
+        self._preview = []
+        self._preview_len = 0
+
+    def __iter__(self):
+        for page_number, text in self._pages:
+            # Same result as normalize_text() over the pages joined with newlines
+            part = normalize_text(text)
+            if part:
+                if self._started:
+                    self._digest.update(b" ")
+                self._digest.update(part.encode("utf-8"))
+                self._started = True
+            if self._preview_len < self._preview_chars:
+                self._preview.append(text[:self._preview_chars - self._preview_len])
+                self._preview_len += len(self._preview[-1])
+            yield page_number, text
+
+    @property
+    def doc_id(self):
+        return self._digest.hexdigest()[:32]
 
-def create_vectorstore(chunks):
+    @property
+    def preview(self):
+        return "\n".join(self._preview)
+
+
+def _build_index(chunks, total=None, progress=None):
     """
-    Create and save a FAISS vector store from text chunks.
+    Embed (text, metadata) chunks and add them to a new FAISS index batch by batch.
     """
     embeddings = get_embeddings_model()
-    vectordb = FAISS.from_texts(chunks, embeddings)
-    vectordb.save_local(VECTOR_DB_PATH)
-    print(f"✅ Vector store created and saved at: {VECTOR_DB_PATH}")
-
-def load_vectorstore():
-    """
-    Load an existing FAISS vector store from disk.
-    """
-    if os.path.exists(VECTOR_DB_PATH):
-        embeddings = get_embeddings_model()
-        # ✅ This flag is REQUIRED for new LangChain versions
-        return FAISS.load_local(
-            folder_path=VECTOR_DB_PATH,
-            embeddings=embeddings,
-            allow_dangerous_deserialization=True
-        )
-    print("⚠ No existing vector store found.")
-    return None
+    with telemetry.span("build_index") as span:
+        start = time.perf_counter()
+        vectordb = None
+        done = 0
+        for batch, vectors in iter_embedded_batches(chunks, embeddings, EMBEDDING_MODEL_NAME):
+            pairs = [(text, vector) for (text, _), vector in zip(batch, vectors)]
+            metadatas = [metadata for _, metadata in batch]
+            if vectordb is None:
+                vectordb = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas)
+            else:
+                vectordb.add_embeddings(pairs, metadatas=metadatas)
+            done += len(batch)
+            if progress:
+                progress(done, total)
+        span.set(chunks=done)
+        if vectordb is None:
+            raise ValueError("No text could be extracted from the document.")
+        record_throughput(done, time.perf_counter() - start)
+        # Large corpora switch from the exact flat index to IVF/HNSW once all vectors are in
+        return ann.maybe_upgrade(vectordb)
+
+
+def _save_index(vectordb, doc_id):
+    """
+    Persist an index under its content address and register it in the memory cache.
+    """
+    path = index_path(doc_id)
+    with telemetry.span("save_index", chunks=vectordb.index.ntotal) as span:
+        # Save into a private directory first so concurrent sessions never see a partial index
+        os.makedirs(VECTOR_DB_ROOT, exist_ok=True)
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_path)
+        documents = _chunk_documents(vectordb, range(vectordb.index.ntotal))
+        faiss.write_index(vectordb.index, os.path.join(tmp_path, FAISS_FILE))
+        write_text_store(tmp_path, documents)
+        lexical = LexicalIndex.build([doc.page_content for doc in documents])
+        lexical.save(os.path.join(tmp_path, LEXICAL_FILE))
+        _LEXICAL_CACHE.put((doc_id, vectordb.index.ntotal), lexical)
+        span.set(bytes=_dir_size(tmp_path))
+        if os.path.isdir(path) and not _is_saved(path):
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another session indexed the same document first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+    # Serve from the memory-mapped copy so the in-memory build can be freed
+    _INDEX_CACHE.put(doc_id, _open_saved_index(path))
+    print(f"✅ Vector store created and saved at: {path}")
+    collect_garbage()
+
+
+def create_vectorstore(chunks, doc_id, progress=None):
+    """
+    Create and save a FAISS vector store for a document.
+    Does nothing if an index with the same content address already exists.
+    `progress(done, total)` is called after each embedded batch.
+    """
+    path = index_path(doc_id)
+    if _is_saved(path):
+        _touch(path)
+        logging.info(f"Vector store for document {doc_id} already exists; skipping indexing.")
+        return doc_id
+
+    vectordb = _build_index(((chunk, {}) for chunk in chunks), len(chunks), progress)
+    _save_index(vectordb, doc_id)
+    return doc_id
+
+
+def index_pages(pages, progress=None, preview_chars=STREAM_PREVIEW_CHARS):
+    """
+    Extract -> chunk -> embed pipeline over (page_number, text) pages. Pages are
+    consumed lazily, so extracted text is chunked and embedded as it arrives rather than
+    joined first; the vectors and chunk texts still accumulate in an in-memory FAISS
+    index until the document is saved, and only then become searchable. Each chunk
+    keeps its page number as metadata. `progress(done, None)` is called after each
+    batch. Returns (doc_id, preview), where preview is the first `preview_chars`
+    characters of the document.
+    """
+    stream = _PageStream(pages, preview_chars)
+    vectordb = _build_index(iter_chunks(stream), progress=progress)
+
+    doc_id = stream.doc_id
+    path = index_path(doc_id)
+    if _is_saved(path):
+        # Already indexed; the embedding cache made the rebuild cheap, keep the stored copy
+        _touch(path)
+        logging.info(f"Vector store for document {doc_id} already exists; discarding rebuilt copy.")
+    else:
+        _save_index(vectordb, doc_id)
+    return doc_id, stream.preview
+
+
+def upload_key(data):
+    """
+    Address of a raw uploaded file (with the index parameters), known before any
+    text is extracted.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{EMBEDDING_MODEL_NAME}|{CHUNK_SIZE}|{CHUNK_OVERLAP}\n".encode("utf-8"))
+    digest.update(data)
+    return digest.hexdigest()[:32]
+
+
+def _upload_file(key):
+    return os.path.join(UPLOADS_DIR, f"{key}.json")
+
+
+def lookup_upload(key):
+    """
+    (doc_id, preview) of an already-indexed upload with this key, or None.
+    """
+    try:
+        with open(_upload_file(key), encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    doc_id = entry.get("doc_id")
+    if not doc_id or not vectorstore_exists(doc_id):
+        # The index was garbage-collected; the upload has to be processed again
+        return None
+    _touch(index_path(doc_id))
+    logging.info(f"Upload already indexed as document {doc_id}; skipping extraction.")
+    return doc_id, entry.get("preview", "")
+
+
+def remember_upload(key, doc_id, preview):
+    """
+    Record which document an upload produced.
+    """
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    path = _upload_file(key)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"doc_id": doc_id, "preview": preview}, f)
+    os.replace(tmp_path, path)
+
+
+def _prune_uploads():
+    # Forget uploads whose index no longer exists
+    if not os.path.isdir(UPLOADS_DIR):
+        return
+    for name in os.listdir(UPLOADS_DIR):
+        path = os.path.join(UPLOADS_DIR, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                doc_id = json.load(f).get("doc_id")
+        except (OSError, ValueError):
+            doc_id = None
+        if not doc_id or not _is_saved(index_path(doc_id)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def _open_saved_index(path):
+    """
+    Open a saved index read-only: the FAISS file and the chunk text store are
+    memory-mapped rather than read and unpickled.
+    """
+    index, vectors_mapped = _read_index(os.path.join(path, FAISS_FILE))
+    ann.configure_search(index)
+    docstore = MmapDocstore(path)
+    vectordb = FAISS(
+        embedding_function=get_embeddings_model(),
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=PositionIds(len(docstore)),
+    )
+    # Read by _index_nbytes so mapped vectors don't count against the cache budget
+    vectordb.vectors_mapped = vectors_mapped
+    return vectordb
+
+
+def load_vectorstore(doc_id):
+    """
+    Return the FAISS vector store for a document, from memory when possible,
+    otherwise from disk.
+    """
+    if not doc_id:
+        return None
+
+    with telemetry.span("load_vectorstore") as span:
+        vectordb = _INDEX_CACHE.get(doc_id)
+        if vectordb is not None:
+            span.set(cache="hit")
+            return vectordb
+
+        span.set(cache="miss")
+        path = index_path(doc_id)
+        if _is_saved(path):
+            vectordb = _open_saved_index(path)
+            _touch(path)
+            _INDEX_CACHE.put(doc_id, vectordb)
+            span.set(bytes=_dir_size(path), chunks=vectordb.index.ntotal)
+            return vectordb
+        print("⚠ No existing vector store found.")
+        return None
+
+
+def _chunk_documents(vectordb, positions):
+    ids = vectordb.index_to_docstore_id
+    return [vectordb.docstore.search(ids[int(i)]) for i in positions]
+
+
+def _chunk_texts(vectordb):
+    return [doc.page_content for doc in _chunk_documents(vectordb, range(vectordb.index.ntotal))]
+
+
+def get_chunks(doc_id):
+    """
+    Return a document's chunk texts in index order.
+    """
+    vectordb = load_vectorstore(doc_id)
+    if vectordb is None:
+        return []
+    return _chunk_texts(vectordb)
+
+
+def _lexical_index(doc_id, vectordb):
+    """
+    BM25 index for a document: from memory, from the file saved next to the FAISS
+    index, or (for indexes saved without one) built from the chunk texts.
+    """
+    key = (doc_id, vectordb.index.ntotal)
+    lexical = _LEXICAL_CACHE.get(key)
+    if lexical is not None:
+        return lexical
+
+    path = os.path.join(index_path(doc_id), LEXICAL_FILE)
+    if os.path.exists(path):
+        lexical = LexicalIndex.load(path)
+    if lexical is None or lexical.n_docs != vectordb.index.ntotal:
+        lexical = LexicalIndex.build(_chunk_texts(vectordb))
+    _LEXICAL_CACHE.put(key, lexical)
+    return lexical
+
+
+def search(doc_id, query, k=RETRIEVAL_K, query_vector=None, use_mmr=RETRIEVAL_MMR):
+    """
+    Hybrid retrieval: dense FAISS candidates and BM25 candidates merged with
+    reciprocal rank fusion, optionally diversified with MMR.
+    Returns the top `k` chunks as Documents, or None if the document has no index.
+    """
+    with telemetry.span("search", k=k) as span:
+        vectordb = load_vectorstore(doc_id)
+        if vectordb is None:
+            return None
+
+        n_docs = vectordb.index.ntotal
+        n_candidates = min(n_docs, max(RETRIEVAL_CANDIDATES, 2 * k))
+        if query_vector is None:
+            with telemetry.span("embed_query"):
+                query_vector = vectordb.embedding_function.embed_query(query)
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(1, -1)
+
+        _, dense_ids = vectordb.index.search(query_vector, n_candidates)
+        dense_ids = dense_ids[0][dense_ids[0] >= 0]
+        lexical_scores = _lexical_index(doc_id, vectordb).scores(query)
+        lexical_ids = top_k(lexical_scores, n_candidates)
+        lexical_ids = lexical_ids[lexical_scores[lexical_ids] > 0]
+
+        candidates, fused = fuse(dense_ids, lexical_ids, n_docs)
+        if use_mmr and len(candidates) > k:
+            vectors = np.vstack([vectordb.index.reconstruct(int(i)) for i in candidates])
+            picked = mmr(vectors, fused, k)
+            chosen = candidates[picked]
+        else:
+            chosen = candidates[:k]
+        documents = _chunk_documents(vectordb, chosen)
+        span.set(candidates=len(candidates), chunks=len(documents),
+                 bytes=sum(len(d.page_content.encode("utf-8")) for d in documents))
+        return documents
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def collect_garbage(max_bytes=VECTOR_DB_MAX_BYTES):
+    """
+    Delete least-recently-used indexes until the store fits within `max_bytes`.
+    Indexes currently held in memory are kept. Returns the number of indexes removed.
+    """
+    if not os.path.isdir(VECTOR_DB_ROOT):
+        return 0
+
+    entries = []
+    for name in os.listdir(VECTOR_DB_ROOT):
+        path = os.path.join(VECTOR_DB_ROOT, name)
+        if not os.path.isdir(path) or path == UPLOADS_DIR:
+            continue
+        if ".tmp-" in name:
+            # Leftover from an interrupted build; drop it once it is clearly abandoned
+            if time.time() - os.path.getmtime(path) > 3600:
+                shutil.rmtree(path, ignore_errors=True)
+            continue
+        entries.append((os.path.getmtime(path), name, _dir_size(path)))
+
+    total = sum(size for _, _, size in entries)
+    removed = 0
+    for _, name, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if name in _INDEX_CACHE:
+            continue
+        shutil.rmtree(os.path.join(VECTOR_DB_ROOT, name), ignore_errors=True)
+        total -= size
+        removed += 1
+
+    if removed:
+        _prune_uploads()
+        logging.info(f"Vector store GC removed {removed} index(es); {total} bytes remain.")
+    return removed
+
+
+def invalidate_vectorstore(doc_id=None):
+    """
+    Drop a document's index from the in-memory cache (all documents if no id is given).
+    """
+    if doc_id is None:
+        _INDEX_CACHE.clear()
+        _LEXICAL_CACHE.clear()
+    else:
+        _INDEX_CACHE.pop(doc_id)
+        # BM25 indexes are keyed by (doc_id, chunk count); drop every size built for it
+        for key in _LEXICAL_CACHE.keys():
+            if key[0] == doc_id:
+                _LEXICAL_CACHE.pop(key)
+
+
+def get_cache_stats():
+    """
+    Return hit rate, entry count and resident bytes of the in-memory index cache.
+    """
+    stats = _INDEX_CACHE.stats()
+    logging.info(
+        f"Index cache: {stats['entries']} entries, {stats['resident_bytes']} bytes, "
+        f"hit rate {stats['hit_rate']:.0%}"
+    )
+    return stats